@@ -0,0 +1,155 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gradebook import BACKENDS, GradebookArchive, iter_class_jobs, iter_gradebooks
+from synthetic import make_templates, make_class_sizes, make_class_lists
+
+# name: (sınıf sayısı, en az öğrenci, en çok öğrenci)
+SCENARIOS = {
+    "small": (10, 5, 60),
+    "medium": (100, 5, 60),
+    "large": (500, 5, 60),
+    "tiny-classes": (100, 5, 5),
+    "full-classes": (100, 60, 60)
+}
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def latency_stats(values):
+    if not values:
+        return None
+    return {
+        "mean": round(statistics.mean(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p90": round(percentile(values, 90), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2)
+    }
+
+def peak_rss_mb():
+    # Linux'ta ru_maxrss KB, macOS'ta byte cinsindendir
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(self_rss, 1), round(children_rss, 1)
+
+def run_scenario(name, backend, workers, module_name="Module 3"):
+    num_classes, min_students, max_students = SCENARIOS[name]
+    class_sizes = make_class_sizes(num_classes, min_students, max_students)
+    templates = make_templates()
+    class_lists = make_class_lists(class_sizes)
+
+    latencies = []
+    arrival_gaps = []
+    output_bytes = 0
+    failed = 0
+    archive = GradebookArchive()
+
+    started = time.perf_counter()
+    last = started
+    for result in iter_gradebooks(iter_class_jobs(io.BytesIO(class_lists), templates), templates, module_name, workers=workers, backend=backend, instrument="timing"):
+        now = time.perf_counter()
+        arrival_gaps.append((now - last) * 1000)
+        last = now
+        if result.timings is not None:
+            latencies.append(result.timings["total_seconds"] * 1000)
+        if result.error:
+            failed += 1
+        else:
+            output_bytes += len(result.data)
+        archive.add_result(result)
+    archive_file = archive.close()
+    wall = time.perf_counter() - started
+    archive_file.seek(0, os.SEEK_END)
+    archive_bytes = archive_file.tell()
+    archive_file.close()
+
+    self_rss, children_rss = peak_rss_mb()
+    return {
+        "scenario": name,
+        "backend": backend,
+        "workers": workers,
+        "classes": num_classes,
+        "students": sum(n for _, n in class_sizes),
+        "failed": failed,
+        "wall_seconds": round(wall, 3),
+        "classes_per_second": round(num_classes / wall, 2) if wall else None,
+        # Bir sınıfın oluşturulma süresi (worker içinde ölçülür)
+        "latency_ms": latency_stats(latencies),
+        # Sonuçların ardışık geliş aralığı; paralel çalışmada gecikmeyi değil verimi gösterir
+        "arrival_gap_ms": latency_stats(arrival_gaps),
+        "peak_rss_mb": self_rss,
+        "peak_worker_rss_mb": children_rss,
+        "output_bytes": output_bytes,
+        "archive_bytes": archive_bytes
+    }
+
+def _scenario_worker(queue, name, backend, workers):
+    queue.put(run_scenario(name, backend, workers))
+
+# Her senaryo ayrı süreçte çalışır; böylece peak RSS ve önbellekler senaryolar arasında karışmaz
+def run_isolated(name, backend, workers):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_scenario_worker, args=(queue, name, backend, workers))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentetik template ve sınıf listeleriyle Gradebook oluşturma benchmark'ı")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=["small", "medium"])
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1])
+    parser.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası (varsayılan: stdout)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.scenarios:
+        for backend in args.backends:
+            for workers in args.workers:
+                result = run_isolated(name, backend, workers)
+                print(f"{name} {backend} workers={workers}: {result['wall_seconds']}s, p50 {result['latency_ms']['p50']}ms, "
+                      f"RSS {result['peak_rss_mb']}MB", file=sys.stderr)
+                results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import io
+import random
+
+import openpyxl
+from openpyxl.styles import Border, Side, Font
+from openpyxl.utils.cell import get_column_letter
+from openpyxl.worksheet.table import Table
+
+# Gerçek template'lere benzer: Overall sayfası + tablo, sayfalar arası formüller, "midterm" ve "met" sekmeleri
+TEMPLATE_ROWS = {"A1": 30, "A2": 25, "B1": 30, "B2": 20}
+TAB_COLUMNS = {"midterm": 26, "met": 31}
+
+thin = Side(border_style="thin", color="000000")
+medium = Side(border_style="medium", color="000000")
+
+def _save(wb):
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def make_template(level, rows=None):
+    rows = rows or TEMPLATE_ROWS.get(level, 30)
+    last = 2 + rows
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Overall"
+    ws["A1"] = f"{level} Gradebook"
+    ws["A1"].font = Font(name="Calibri", size=14, bold=True)
+    ws["H1"] = "Advisor: -"
+
+    headers = ["No", "Number", "Name", "Surname", "Average", "Midterm", "MET", "W1", "W2", "W3", "W4", "Total", "Q1", "Q2", "Grade"]
+    for c, header in enumerate(headers, 1):
+        ws.cell(row=2, column=c, value=header)
+    for r in range(3, last + 1):
+        ws.cell(row=r, column=1, value=r - 2)
+        ws.cell(row=r, column=5, value=f"=AVERAGE(F{r}:G{r})")
+        ws.cell(row=r, column=6, value=f"=midterm!E{r}")
+        ws.cell(row=r, column=7, value=f"='met'!E{r}")
+        ws.cell(row=r, column=12, value=f"=SUM(E{r}:G{r})/LOG10(100)")
+        ws.cell(row=r, column=15, value=f'=IF(E{r}>=60,"PASS","FAIL")')
+        for c in range(1, len(headers) + 1):
+            ws.cell(row=r, column=c).border = Border(left=thin, right=thin, top=medium if r == 3 else thin, bottom=medium if r == last else thin)
+    ws.cell(row=last + 2, column=5, value=f"=AVERAGE(E3:E{last})")
+    ws.cell(row=last + 3, column=5, value=f"=COUNT($E$3:$E${last})")
+    ws.add_table(Table(displayName=f"{level}_Overall", ref=f"A2:{get_column_letter(len(headers))}{last}"))
+
+    for name, columns in TAB_COLUMNS.items():
+        sheet = wb.create_sheet(name)
+        sheet["A1"] = name
+        for c in range(1, columns + 1):
+            sheet.cell(row=2, column=c, value=f"H{c}")
+        for r in range(3, last + 1):
+            sheet.cell(row=r, column=1, value=f"=Overall!A{r}")
+            sheet.cell(row=r, column=5, value=f"=SUM(F{r}:H{r})")
+            sheet.cell(row=r, column=14, value=f"=F{r}*2")
+            for c in range(1, columns + 1):
+                sheet.cell(row=r, column=c).border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        sheet.cell(row=last + 1, column=5, value=f"=AVERAGE(E3:E{last})")
+        sheet.add_table(Table(displayName=f"{level}_{name}", ref=f"A2:{get_column_letter(columns)}{last + 1}"))
+    return _save(wb)
+
+def make_templates(levels=("A1", "A2", "B1", "B2")):
+    return {level: make_template(level) for level in levels}
+
+def make_class_sizes(num_classes, min_students=5, max_students=60, levels=("A1", "A2", "B1", "B2"), seed=0):
+    rng = random.Random(seed)
+    return [(f"{levels[i % len(levels)]}.{i // len(levels) + 1:02d}", rng.randint(min_students, max_students)) for i in range(num_classes)]
+
+# Registrar çıktısı gibi: başlık satırı, öğrenciler, boş satır ve altında okunmaması gereken satırlar
+def make_class_lists(class_sizes):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for class_name, num_students in class_sizes:
+        ws = wb.create_sheet(class_name)
+        ws.append([f"{class_name} Class List"])
+        ws.append([None, "STUDENT NUMBER", "NAME", "SURNAME", "Advisor: Jane Roe"])
+        for i in range(num_students):
+            ws.append([i + 1, 20240000 + i, f"Name{i}", f"Surname{i}"])
+        ws.append([None])
+        ws.append(["Total", num_students])
+    return _save(wb)
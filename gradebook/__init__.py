@@ -0,0 +1,9 @@
+from .core import get_class_info_from_sheet, iter_class_rosters, load_class_lists, process_class_template, get_compiled_template
+from .batch import LEVELS, BACKENDS, DEFAULT_BACKEND, ClassJob, ClassResult, iter_class_jobs, count_level_sheets, iter_gradebooks, iter_gradebook_updates, run_class_modules, default_workers
+from .archive import GradebookArchive, GradebookDirectory
+from .formulas import compile_formula, shift_formula_rows, translate_formula_rows
+from .ooxml import process_class_template_ooxml, render_class_workbook, UnsupportedTemplateError
+from .cache import GradebookCache, GENERATOR_VERSION, default_cache_dir
+from .timing import StageTimer, INSTRUMENT_MODES, timing_rows, summarize_stages
+from .update import update_class_gradebook, ExistingGradebooks
+from .modules import MODULE_PLACEHOLDER, parse_module_names, iter_module_variants
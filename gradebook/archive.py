@@ -0,0 +1,106 @@
+import os
+import tempfile
+import time
+import zipfile
+
+# Bu boyutu aşan arşivler RAM yerine diskteki geçici dosyaya taşınır
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+# Ölçüm açıksa çıktıya yazma süresi de sınıfın aşamalarına eklenir
+def record_output_write(result, seconds):
+    result.timings["stages"].append({"stage": "write_output", "sheet": None, "cells": len(result.data), "seconds": seconds})
+
+# .xlsx dosyaları zaten deflate ile sıkıştırılmış ZIP'ler; varsayılan olarak tekrar sıkıştırılmadan saklanır
+class GradebookArchive:
+    def __init__(self, target=None, compress=False, spool_max_size=SPOOL_MAX_SIZE):
+        self.owns_file = target is None
+        self.target = tempfile.SpooledTemporaryFile(max_size=spool_max_size) if target is None else target
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self.zip_file = zipfile.ZipFile(self.target, "w", compression)
+        self.count = 0
+        self.failed = []
+        self.unchanged = []
+
+    def add(self, arcname, data):
+        self.zip_file.writestr(arcname, data)
+        self.count += 1
+
+    def add_result(self, result):
+        if result.error:
+            self.failed.append(result)
+            return
+        if result.unchanged:
+            self.unchanged.append(result)
+            return
+        started = time.perf_counter()
+        self.add(result.arcname, result.data)
+        if result.timings is not None:
+            record_output_write(result, time.perf_counter() - started)
+
+    def add_results(self, results):
+        for result in results:
+            self.add_result(result)
+        return self.failed
+
+    def close(self):
+        if self.zip_file.fp is not None:
+            self.zip_file.close()
+        if self.owns_file:
+            self.target.seek(0)
+        return self.target
+
+    def read_bytes(self):
+        archive_file = self.close()
+        archive_file.seek(0)
+        return archive_file.read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.owns_file:
+            self.zip_file.close()
+            self.target.close()
+        else:
+            self.close()
+
+# Arşiv yerine her gradebook'u seviye klasörüne ayrı dosya olarak yazar (CLI çıktı klasörü için)
+class GradebookDirectory:
+    def __init__(self, root):
+        self.root = root
+        self.count = 0
+        self.failed = []
+        self.unchanged = []
+
+    def add(self, arcname, data):
+        path = os.path.join(self.root, *arcname.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.count += 1
+
+    def add_result(self, result):
+        if result.error:
+            self.failed.append(result)
+            return
+        if result.unchanged:
+            self.unchanged.append(result)
+            return
+        started = time.perf_counter()
+        self.add(result.arcname, result.data)
+        if result.timings is not None:
+            record_output_write(result, time.perf_counter() - started)
+
+    def add_results(self, results):
+        for result in results:
+            self.add_result(result)
+        return self.failed
+
+    def close(self):
+        return self.root
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,242 @@
+import multiprocessing
+import os
+import traceback
+from collections import Counter, deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .core import iter_class_rosters, load_class_lists, process_class_template
+from .ooxml import process_class_template_ooxml
+from .cache import gradebook_cache_key, template_digest
+from .update import update_class_gradebook
+from .modules import MODULE_PLACEHOLDER, iter_module_variants
+from .timing import StageTimer, NULL_TIMER, INSTRUMENT_MODES
+
+LEVELS = ["A1", "A2", "B1", "B2"]
+
+ClassJob = namedtuple("ClassJob", ["level", "class_name", "students", "advisor_name"])
+# module_name sadece çok modüllü çalıştırmada doludur
+ClassResult = namedtuple("ClassResult", ["job", "arcname", "data", "error", "cached", "timings", "unchanged", "module_name"], defaults=(False, None, False, None))
+
+# "ooxml" template XML'ini doğrudan yamalar; desteklenmeyen template'lerde openpyxl'e geri döner.
+# Yeni yol yeterince denenene kadar varsayılan openpyxl'dir
+BACKENDS = {
+    "openpyxl": process_class_template,
+    "ooxml": process_class_template_ooxml
+}
+DEFAULT_BACKEND = "openpyxl"
+
+def default_workers():
+    return os.cpu_count() or 1
+
+# templates verilmezse bilinen tüm seviyeler okunur. Güncelleme modunda mevcut gradebook'u olan seviyeler de eklenir;
+# template'i ve dosyası olmayan seviyelerin sınıfları hiç iş olarak üretilmez
+def get_template_levels(templates, existing=None):
+    if templates is None:
+        return set(LEVELS)
+    levels = {level for level, template in templates.items() if template}
+    if existing is not None:
+        levels |= existing.levels
+    return levels
+
+# Class Lists dosyasını read-only modda açar; ilk sınıfın işi, sonraki sayfalar okunmadan üretilir
+def iter_class_jobs(class_lists_file, templates=None, existing=None):
+    levels = get_template_levels(templates, existing)
+    class_wb = load_class_lists(class_lists_file)
+    try:
+        for sheet_name, students, advisor_name in iter_class_rosters(class_wb, levels):
+            if students:
+                yield ClassJob(sheet_name.split(".")[0], sheet_name, students, advisor_name)
+    finally:
+        class_wb.close()
+
+# İlerleme göstergesi için seviye başına sınıf sayısı; liste bir kez okunup aynı işler iter_gradebooks'a verilir
+def count_level_sheets(jobs):
+    return Counter(job.level for job in jobs)
+
+def gradebook_arcname(job, module_name=None):
+    if module_name is not None:
+        return f"{module_name}/{job.level}/{job.class_name} Gradebook.xlsx"
+    return f"{job.level}/{job.class_name} Gradebook.xlsx"
+
+# Tek modül adı ya da modül adları listesi verilebilir
+def get_module_names(module_name):
+    return [module_name] if isinstance(module_name, str) else list(module_name)
+
+# instrument verilirse ("timing", "cprofile", "tracemalloc") aşama süreleri sonuçla birlikte döner.
+# generate None dönerse sınıf değişmemiş sayılır
+def _run_instrumented(job, backend, instrument, generate):
+    timer = StageTimer(instrument) if instrument else None
+    try:
+        if timer is not None:
+            timer.start()
+        try:
+            data = generate(timer or NULL_TIMER)
+        finally:
+            if timer is not None:
+                timer.stop()
+        result = ClassResult(job, gradebook_arcname(job), data, None, unchanged=data is None)
+    except Exception as e:
+        result = ClassResult(job, gradebook_arcname(job), None, "".join(traceback.format_exception_only(type(e), e)).strip())
+    if timer is not None:
+        report = timer.report()
+        report.update({"class": job.class_name, "level": job.level, "backend": backend, "students": len(job.students)})
+        result = result._replace(timings=report)
+    return result
+
+def run_class_job(job, templates, module_name, backend=DEFAULT_BACKEND, instrument=None):
+    return _run_instrumented(job, backend, instrument, lambda timer: BACKENDS[backend](
+        templates[job.level], job.class_name, job.students, module_name, job.advisor_name, timer))
+
+# Birden çok modülde sınıf bir kez oluşturulur, her modül için sadece başlık yamalanır.
+# Sonuçlar "Module N/seviye/sınıf" altına yazılır; aşama ölçümleri ilk modülün sonucuyla döner
+def run_class_modules(job, templates, module_names, backend=DEFAULT_BACKEND, instrument=None):
+    if len(module_names) == 1:
+        return [run_class_job(job, templates, module_names[0], backend, instrument)]
+
+    def generate(timer):
+        data = BACKENDS[backend](templates[job.level], job.class_name, job.students, MODULE_PLACEHOLDER, job.advisor_name, timer)
+        with timer.stage("module_titles", cells=len(module_names)):
+            return list(iter_module_variants(data, module_names))
+
+    result = _run_instrumented(job, backend, instrument, generate)
+    if result.timings is not None:
+        result.timings["modules"] = len(module_names)
+    if result.error:
+        return [result._replace(arcname=gradebook_arcname(job, module_name), module_name=module_name, timings=result.timings if i == 0 else None)
+                for i, module_name in enumerate(module_names)]
+    return [result._replace(arcname=gradebook_arcname(job, module_name), data=data, module_name=module_name, timings=result.timings if i == 0 else None)
+            for i, (module_name, data) in enumerate(result.data)]
+
+# --- WORKER SÜREÇLERİ: TEMPLATE'LER HER SÜREÇE BİR KEZ GÖNDERİLİR ---
+_worker_templates = {}
+_worker_module_names = []
+_worker_backend = DEFAULT_BACKEND
+_worker_instrument = None
+
+def _init_worker(templates, module_names, backend, instrument):
+    global _worker_templates, _worker_module_names, _worker_backend, _worker_instrument
+    _worker_templates = templates
+    _worker_module_names = module_names
+    _worker_backend = backend
+    _worker_instrument = instrument
+
+def _run_worker_job(job):
+    return run_class_modules(job, _worker_templates, _worker_module_names, _worker_backend, _worker_instrument)
+
+# Her modülün çıktısı ayrı anahtarla saklanır; isabet ve ıska modül girdisi başına sayılır.
+# Sınıfın tüm modülleri önbellekteyse sınıf yeniden oluşturulmaz
+def _cache_lookup(cache, template_hashes, job, module_names, backend):
+    if cache is None:
+        return None, None
+    lookup = []
+    for module_name in module_names:
+        key = gradebook_cache_key(template_hashes[job.level], job, module_name, backend)
+        data = cache.get(key)
+        result_module = module_name if len(module_names) > 1 else None
+        lookup.append((key, ClassResult(job, gradebook_arcname(job, result_module), data, None, True, module_name=result_module) if data is not None else None))
+    if all(cached is not None for _, cached in lookup):
+        return lookup, [cached for _, cached in lookup]
+    return lookup, None
+
+# Oluşturulan modüller önbelleğe yazılır; önbellekte bulunanlar oradan döner (sayılan isabetlerle tutarlı)
+def _cache_store(cache, lookup, results):
+    if cache is None or lookup is None:
+        return results
+    merged = []
+    for (key, cached), result in zip(lookup, results):
+        if cached is not None:
+            merged.append(cached._replace(timings=result.timings) if result.timings is not None else cached)
+        else:
+            if not result.error and not result.cached:
+                cache.put(key, result.data)
+            merged.append(result)
+    return merged
+
+def _run_with_cache(cache, template_hashes, job, templates, module_names, backend, instrument):
+    lookup, results = _cache_lookup(cache, template_hashes, job, module_names, backend)
+    if results is None:
+        results = _cache_store(cache, lookup, run_class_modules(job, templates, module_names, backend, instrument))
+    return results
+
+def _done_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+# Sonuçlar her zaman jobs sırasıyla döner; bir sınıftaki hata toplu işi durdurmaz.
+# jobs liste olabileceği gibi iter_class_jobs gibi tembel bir üreteç de olabilir.
+# cache verilirse önbellekte bulunan sınıflar yeniden oluşturulmaz.
+# module_name liste ise her sınıf için modül sırasıyla birer sonuç döner
+def iter_gradebooks(jobs, templates, module_name, workers=1, backend=DEFAULT_BACKEND, cache=None, instrument=None):
+    module_names = get_module_names(module_name)
+    if not module_names:
+        raise ValueError("En az bir modül adı verilmeli")
+    if backend not in BACKENDS:
+        raise ValueError(f"Bilinmeyen backend: {backend}")
+    if instrument is not None and instrument not in INSTRUMENT_MODES:
+        raise ValueError(f"Bilinmeyen ölçüm modu: {instrument}")
+    workers = max(1, int(workers or 1))
+    if hasattr(jobs, "__len__"):
+        workers = max(1, min(workers, len(jobs)))
+    jobs = iter(jobs)
+    template_hashes = {level: template_digest(data) for level, data in templates.items() if data} if cache is not None else None
+    
+    if workers == 1:
+        for job in jobs:
+            yield from _run_with_cache(cache, template_hashes, job, templates, module_names, backend, instrument)
+        return
+        
+    # Streamlit sunucusu çok thread'li çalıştığı için fork yerine spawn kullanılıyor
+    context = multiprocessing.get_context("spawn")
+    # Bellekte bekleyen sonuç sayısını sınırlamak için aynı anda en fazla bu kadar iş kuyruğa alınır
+    max_pending = workers * 2
+    pending = deque()
+    try:
+        # Worker süreçleri ilk submit'te başlar; tüm sınıflar önbellekteyse hiç süreç açılmaz
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(templates, module_names, backend, instrument)) as executor:
+            for job in jobs:
+                lookup, results = _cache_lookup(cache, template_hashes, job, module_names, backend)
+                if results is not None:
+                    future = _done_future(results)
+                else:
+                    try:
+                        future = executor.submit(_run_worker_job, job)
+                    except BrokenProcessPool:
+                        # Havuz zaten bozulduysa bu sınıf da aşağıda seri olarak oluşturulur
+                        pending.append((job, lookup, None))
+                        raise
+                pending.append((job, lookup, future))
+                if len(pending) >= max_pending:
+                    results = pending[0][2].result()
+                    yield from _cache_store(cache, pending.popleft()[1], results)
+            while pending:
+                results = pending[0][2].result()
+                yield from _cache_store(cache, pending.popleft()[1], results)
+    except BrokenProcessPool:
+        # Bir worker beklenmedik şekilde kapanırsa kalan sınıflar seri olarak tamamlanır
+        for job, lookup, future in pending:
+            if future is not None and future.done() and future.exception() is None:
+                results = future.result()
+            else:
+                results = run_class_modules(job, templates, module_names, backend, instrument)
+            yield from _cache_store(cache, lookup, results)
+        for job in jobs:
+            yield from _run_with_cache(cache, template_hashes, job, templates, module_names, backend, instrument)
+
+# --- GÜNCELLEME MODU: MEVCUT GRADEBOOK'LAR YENİ LİSTEYE GÖRE SATIR EKLENİP SİLİNEREK GÜNCELLENİR ---
+def update_class_job(job, existing, templates, module_name, backend=DEFAULT_BACKEND, instrument=None):
+    gradebook_bytes = existing.get(gradebook_arcname(job))
+    if gradebook_bytes is None:
+        # Yeni açılan sınıflar template'ten oluşturulur
+        if templates.get(job.level):
+            return run_class_job(job, templates, module_name, backend, instrument)
+        return ClassResult(job, gradebook_arcname(job), None, "Mevcut gradebook bulunamadı ve template verilmedi")
+
+    return _run_instrumented(job, "update", instrument, lambda timer: update_class_gradebook(
+        gradebook_bytes, job.class_name, job.students, job.advisor_name, timer))
+
+# Listesi değişmeyen sınıflar unchanged=True ile döner ve arşive yazılmaz; sonuçlar jobs sırasıyla gelir
+def iter_gradebook_updates(jobs, existing, templates, module_name, backend=DEFAULT_BACKEND, instrument=None):
+    for job in jobs:
+        yield update_class_job(job, existing, templates, module_name, backend, instrument)
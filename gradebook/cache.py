@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from .formats import format_tables_digest
+
+# Çıktıyı değiştiren her değişiklikte artırılır; eski önbellek kayıtları böylece kendiliğinden geçersiz olur
+GENERATOR_VERSION = "2"
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "gradebook")
+
+def template_digest(template_bytes):
+    return hashlib.sha256(template_bytes).hexdigest()
+
+def gradebook_cache_key(template_hash, job, module_name, backend):
+    roster = [[student["index"], student["number"], student["name"], student["surname"]] for student in job.students]
+    payload = json.dumps({
+        "version": GENERATOR_VERSION,
+        "backend": backend,
+        "template": template_hash,
+        "formats": format_tables_digest(),
+        "class_name": job.class_name,
+        "advisor": job.advisor_name,
+        "module": module_name,
+        "roster": roster
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Oluşturulan gradebook'lar içerik anahtarıyla diskte saklanır; boyut sınırı aşılınca en eski kullanılanlar silinir
+class GradebookCache:
+    def __init__(self, root=None, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".xlsx")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        # Erişim zamanı LRU sıralaması için güncellenir
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Aynı anahtar yeniden yazılırsa eski kaydın boyutu toplamdan düşülür
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        # Toplam boyut bir kez diskten okunur, sonra yazılan kayıtlarla birlikte takip edilir
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(data) - old_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".xlsx"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
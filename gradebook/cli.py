@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .archive import GradebookArchive, GradebookDirectory
+from .cache import GradebookCache, DEFAULT_CACHE_MAX_BYTES
+from .timing import INSTRUMENT_MODES, summarize_stages
+from .batch import LEVELS, BACKENDS, DEFAULT_BACKEND, iter_class_jobs, iter_gradebooks, iter_gradebook_updates, default_workers
+from .update import ExistingGradebooks
+
+# Çıkış kodları: tüm sınıflar oluşturuldu / bazı sınıflar başarısız / girdi hatası
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_INPUT_ERROR = 2
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m gradebook", description="Class Lists dosyasından seviye template'lerine göre Gradebook dosyaları oluşturur.")
+    parser.add_argument("--class-lists", required=True, help="Class Lists (.xlsx) dosyası")
+    for level in LEVELS:
+        parser.add_argument(f"--{level.lower()}", dest=level, metavar="TEMPLATE", help=f"{level} Gradebook template'i (.xltx/.xlsx)")
+    parser.add_argument("--module", nargs="+", default=["Module 3"], help="Modül adı (varsayılan: Module 3); birden fazla verilirse sınıflar bir kez oluşturulup \"Module N/seviye/\" altına yazılır")
+    parser.add_argument("--output", required=True, help=".zip ile bitiyorsa ZIP arşivi, değilse çıktı klasörü")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Paralel işlem sayısı")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="Oluşturma motoru")
+    parser.add_argument("--update", metavar="EXISTING", help="Daha önce oluşturulan ZIP/klasör; sadece listesi değişen sınıflar güncellenip yazılır")
+    parser.add_argument("--compress", action="store_true", help="ZIP dosyasını ayrıca sıkıştır")
+    parser.add_argument("--cache", action="store_true", help="Değişmeyen sınıfları diskteki önbellekten al")
+    parser.add_argument("--cache-dir", help="Önbellek klasörü (verilirse --cache açılır)")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024), help="Önbelleğin en fazla boyutu (MB)")
+    parser.add_argument("--instrument", choices=INSTRUMENT_MODES, help="Sınıf ve sayfa başına aşama sürelerini ölç (cprofile/tracemalloc ek profil çıkarır)")
+    parser.add_argument("--timings", help="Aşama ölçümlerinin yazılacağı JSON dosyası (--instrument verilmezse timing açılır)")
+    parser.add_argument("--summary", help="JSON özetin yazılacağı dosya (varsayılan: stdout)")
+    return parser
+
+def read_templates(args):
+    templates = {}
+    for level in LEVELS:
+        path = getattr(args, level)
+        if path:
+            with open(path, "rb") as f:
+                templates[level] = f.read()
+    return templates
+
+def same_path(first, second):
+    if os.path.abspath(first) == os.path.abspath(second):
+        return True
+    try:
+        return os.path.samefile(first, second)
+    except OSError:
+        return False
+
+def open_output(args):
+    if args.output.lower().endswith(".zip"):
+        return GradebookArchive(open(args.output, "wb"), compress=args.compress)
+    return GradebookDirectory(args.output)
+
+def write_summary(summary, path):
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+def collect_timings(results, reports):
+    # Çıktıya yazma süresi add_result içinde eklendiği için rapor sonuç tüketildikten sonra alınır
+    for result in results:
+        yield result
+        if result.timings is not None:
+            reports.append(result.timings)
+
+def write_timings(reports, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"stages": summarize_stages(reports), "classes": reports}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    instrument = args.instrument or ("timing" if args.timings else None)
+    timing_reports = []
+
+    modules = list(dict.fromkeys(name.strip() for name in args.module if name.strip()))
+
+    try:
+        templates = read_templates(args)
+        if not templates and not args.update:
+            raise ValueError("En az bir seviye template'i verilmeli.")
+        if not modules:
+            raise ValueError("En az bir modül adı verilmeli.")
+        if args.update and len(modules) > 1:
+            raise ValueError("Güncelleme modu tek modül adıyla çalışır.")
+        if args.update and same_path(args.update, args.output):
+            raise ValueError("--update ve --output aynı dosya/klasör olamaz; çıktı açılırken mevcut gradebook'lar silinir.")
+        # Dosya tembel okunduğu için yanlış yol çıktı açılmadan önce yakalanır
+        with open(args.class_lists, "rb"):
+            pass
+        existing = ExistingGradebooks(args.update) if args.update else None
+        # Güncelleme modunda template'i olmayan seviyelerin sınıfları da mevcut dosyalardan güncellenir
+        jobs = iter_class_jobs(args.class_lists, templates, existing)
+        cache = GradebookCache(args.cache_dir, args.cache_max_mb * 1024 * 1024) if args.cache or args.cache_dir else None
+
+        output = open_output(args)
+        try:
+            with output:
+                if existing is not None:
+                    results = iter_gradebook_updates(jobs, existing, templates, modules[0], backend=args.backend, instrument=instrument)
+                else:
+                    results = iter_gradebooks(jobs, templates, modules, workers=args.workers, backend=args.backend, cache=cache, instrument=instrument)
+                failed = output.add_results(collect_timings(results, timing_reports))
+        finally:
+            if isinstance(output, GradebookArchive):
+                output.target.close()
+            if existing is not None:
+                existing.close()
+    except (OSError, ValueError, InvalidFileException, zipfile.BadZipFile) as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        write_summary({"status": "error", "error": str(e)}, args.summary)
+        return EXIT_INPUT_ERROR
+
+    for result in failed:
+        module_suffix = f" ({result.module_name})" if result.module_name else ""
+        print(f"{result.job.class_name}{module_suffix}: {result.error}", file=sys.stderr)
+
+    if args.timings:
+        write_timings(timing_reports, args.timings)
+
+    write_summary({
+        "status": "partial" if failed else "ok",
+        "output": args.output,
+        "module": modules[0] if len(modules) == 1 else modules,
+        "backend": args.backend,
+        "generated": output.count,
+        "unchanged": len(output.unchanged) if existing is not None else None,
+        "cache": {"hits": cache.hits, "misses": cache.misses} if cache is not None else None,
+        "failed": [{"level": r.job.level, "class": r.job.class_name, "module": r.module_name, "error": r.error} for r in failed],
+        "stages": summarize_stages(timing_reports) if instrument else None,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }, args.summary)
+    return EXIT_PARTIAL if failed else EXIT_OK
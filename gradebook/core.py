@@ -0,0 +1,543 @@
+import openpyxl
+from openpyxl.utils.cell import range_boundaries, get_column_letter
+from openpyxl.styles import Font, Border, Side
+from openpyxl.workbook.protection import WorkbookProtection, FileSharing
+from openpyxl.worksheet.table import TableList
+from openpyxl.cell.cell import Cell
+from openpyxl.styles.cell_style import StyleArray
+import io
+from copy import copy
+import copyreg
+import hashlib
+import pickle
+
+from .formulas import shift_formula_rows, translate_formula_rows, freeze_sheet_shifts
+from .timing import NULL_TIMER
+from .formats import get_format_plan, apply_formats
+
+def _row_value(row, idx):
+    # read-only modda boyut bilgisi eksik sayfalarda satırlar kısa gelebilir
+    return row[idx] if idx < len(row) else None
+
+def get_class_info_from_sheet(sheet):
+    students = []
+    advisor_name = ""
+    start_reading = False
+    
+    for row in sheet.iter_rows(values_only=True):
+        if _row_value(row, 1) == "STUDENT NUMBER":
+            start_reading = True
+            for cell_val in row:
+                if cell_val and isinstance(cell_val, str) and "Advisor" in cell_val:
+                    advisor_name = cell_val.split(":")[-1].strip()
+                    break
+            continue
+            
+        if start_reading:
+            if not _row_value(row, 0) or not str(row[0]).strip().isdigit():
+                break
+            students.append({
+                "index": row[0],
+                "number": _row_value(row, 1),
+                "name": _row_value(row, 2),
+                "surname": _row_value(row, 3)
+            })
+            
+    return students, advisor_name
+
+def load_class_lists(class_lists_file):
+    return openpyxl.load_workbook(class_lists_file, read_only=True, data_only=True)
+
+# Şablonu olmayan seviyelerin sayfaları hiç okunmaz; sınıflar sayfa sırasıyla tek tek döner
+def iter_class_rosters(class_wb, levels=None):
+    for sheet_name in class_wb.sheetnames:
+        if levels is not None and sheet_name.split(".")[0] not in levels:
+            continue
+        students, advisor_name = get_class_info_from_sheet(class_wb[sheet_name])
+        yield sheet_name, students, advisor_name
+
+# --- GERÇEK KULLANILAN ALAN: DEĞERLER, FORMÜLLER, TABLOLAR VE BİRLEŞTİRİLMİŞ HÜCRELER ---
+# Sadece biçim taşıyan boş hücreler (Excel'de 1048576. satıra/XFD sütununa kadar uzayabilir) sayılmaz
+def get_used_range(ws):
+    used_max_row, used_max_col = 1, 1
+    for (row, col), cell in ws._cells.items():
+        if cell._value is not None or cell.comment is not None or cell.hyperlink is not None:
+            if row > used_max_row:
+                used_max_row = row
+            if col > used_max_col:
+                used_max_col = col
+    for table in ws.tables.values():
+        min_col, min_row, max_col, max_row = range_boundaries(table.ref)
+        used_max_row = max(used_max_row, max_row)
+        used_max_col = max(used_max_col, max_col)
+    for merged in ws.merged_cells.ranges:
+        used_max_row = max(used_max_row, merged.max_row)
+        used_max_col = max(used_max_col, merged.max_col)
+    return used_max_row, used_max_col
+
+def get_template_student_rows(wb, sheet_idx, start_row=3, used_range=None):
+    ws = wb.worksheets[sheet_idx]
+    
+    for table in ws.tables.values():
+        min_col, min_row, max_col, max_row = range_boundaries(table.ref)
+        if min_row <= start_row <= max_row:
+            return max_row - start_row + 1
+            
+    used_max_row, _ = used_range or get_used_range(ws)
+    count = 0
+    for r in range(start_row, used_max_row + 1):
+        cell = ws._cells.get((r, 1))
+        val = cell.value if cell is not None else None
+        if val is not None and str(val).strip() != "" and str(val).strip() != "0":
+            count += 1
+        else:
+            break
+            
+    if count > 0:
+        return count
+        
+    if sheet_idx > 0:
+        return get_template_student_rows(wb, 0, start_row)
+        
+    return 30
+
+def get_actual_max_col(ws, used_range=None):
+    # --- GERÇEK SÜTUN SINIRINI BULMA (HAYALET HÜCRE ENGELLEYİCİ) ---
+    actual_max_col = 1
+    if list(ws.tables.values()):
+        for table in ws.tables.values():
+            min_col, min_row, max_col, max_row = range_boundaries(table.ref)
+            if max_col > actual_max_col:
+                actual_max_col = max_col
+    else:
+        # Başlık satırlarında (1-2) değeri olan en sağdaki sütun; sadece mevcut hücrelere bakılır
+        for (row, col), cell in ws._cells.items():
+            if row <= 2 and col > actual_max_col and cell.value is not None:
+                actual_max_col = col
+        if actual_max_col == 1:
+            actual_max_col = (used_range or get_used_range(ws))[1]
+    return actual_max_col
+
+def get_student_block_borders(ws, start_row, current_rows, actual_max_col):
+    original_last_student_row = start_row + current_rows - 1
+    original_top_borders = []
+    original_bottom_borders = []
+    internal_horizontal_borders = []
+    default_thin = Side(border_style="thin", color="000000")
+    
+    for c in range(1, actual_max_col + 1):
+        cell_first = ws.cell(row=start_row, column=c)
+        cell_last = ws.cell(row=original_last_student_row, column=c)
+        
+        b_top = cell_first.border.top if cell_first.border else None
+        b_bot = cell_last.border.bottom if cell_last.border else None
+        
+        original_top_borders.append(b_top if b_top and b_top.style else default_thin)
+        original_bottom_borders.append(b_bot if b_bot and b_bot.style else default_thin)
+        
+        if current_rows > 1:
+            b_mid = cell_first.border.bottom if cell_first.border else None
+            internal_horizontal_borders.append(b_mid if b_mid and b_mid.style else default_thin)
+        else:
+            internal_horizontal_borders.append(default_thin)
+            
+    return original_top_borders, original_bottom_borders, internal_horizontal_borders
+
+# --- TEMPLATE SAYFASININ SINIFTAN BAĞIMSIZ YERLEŞİMİ (BİR KEZ HESAPLANIR) ---
+class SheetLayout:
+    def __init__(self, ws, current_rows, start_row=3, used_range=None):
+        self.start_row = start_row
+        self.current_rows = current_rows
+        used_max_row, used_max_col = used_range or get_used_range(ws)
+        self.actual_max_col = get_actual_max_col(ws, (used_max_row, used_max_col))
+        # Öğrenci bloğu boş satırlardan oluşsa bile kullanılan alana dahildir
+        self.used_max_row = max(used_max_row, start_row + current_rows - 1)
+        self.used_max_col = max(used_max_col, self.actual_max_col)
+        self.table_refs = dict(ws.tables.items())
+        self.top_borders, self.bottom_borders, self.internal_borders = get_student_block_borders(ws, start_row, current_rows, self.actual_max_col)
+        self.master_formulas = {}
+        for c in range(1, self.actual_max_col + 1):
+            master_cell = ws.cell(row=start_row, column=c)
+            if master_cell.data_type == 'f' and master_cell.value:
+                self.master_formulas[c] = master_cell.value
+
+# Kullanılan alanın dışında kalan boş (sadece biçimli) hücreler ve satır biçimleri çıktıya taşınmaz
+def trim_to_used_range(ws, layout):
+    max_row, max_col = layout.used_max_row, layout.used_max_col
+    for key in [key for key in ws._cells if key[0] > max_row or key[1] > max_col]:
+        del ws._cells[key]
+    for row in [row for row in ws.row_dimensions if row > max_row]:
+        del ws.row_dimensions[row]
+
+class _WorkbookPickler(pickle.Pickler):
+    # TableList.items() sadece (isim, ref) döndürüyor; tabloları Table nesneleri olarak saklamak için
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[TableList] = lambda tables: (TableList, (), None, None, iter(dict.items(tables)))
+
+# --- SEVİYE BAŞINA BİR KEZ PARSE EDİLEN TEMPLATE, HER SINIF İÇİN HAFIZADA KOPYALANIR ---
+class CompiledTemplate:
+    def __init__(self, template_bytes, start_row=3):
+        self.template_bytes = template_bytes
+        self.key = hashlib.sha256(template_bytes).hexdigest()
+        wb = openpyxl.load_workbook(filename=io.BytesIO(template_bytes))
+        self.sheetnames = list(wb.sheetnames)
+        self.layouts = []
+        for i, ws in enumerate(wb.worksheets):
+            used_range = get_used_range(ws)
+            layout = SheetLayout(ws, get_template_student_rows(wb, i, start_row, used_range), start_row, used_range)
+            trim_to_used_range(ws, layout)
+            self.layouts.append(layout)
+            # Template'in koşullu biçimleri her sınıfta plandan yeniden eklendiği için bir kez temizlenir
+            ws.conditional_formatting._cf_rules.clear()
+            ws.extLst = None
+        
+        self._pickled = None
+        try:
+            buffer = io.BytesIO()
+            _WorkbookPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(wb)
+            self._pickled = buffer.getvalue()
+        except Exception:
+            pass
+
+    def new_workbook(self):
+        if self._pickled is not None:
+            try:
+                return pickle.loads(self._pickled)
+            except Exception:
+                self._pickled = None
+        return openpyxl.load_workbook(filename=io.BytesIO(self.template_bytes))
+
+_compiled_templates = {}
+MAX_COMPILED_TEMPLATES = 8
+
+def get_compiled_template(template_bytes):
+    key = hashlib.sha256(template_bytes).hexdigest()
+    compiled = _compiled_templates.get(key)
+    if compiled is None:
+        compiled = CompiledTemplate(template_bytes)
+        if len(_compiled_templates) >= MAX_COMPILED_TEMPLATES:
+            _compiled_templates.pop(next(iter(_compiled_templates)))
+        _compiled_templates[key] = compiled
+    return compiled
+
+def get_row_shift(num_students, current_rows, start_row=3):
+    action_row_idx = start_row + (current_rows // 2)
+    if action_row_idx <= start_row:
+        action_row_idx = start_row + 1
+    offset = num_students - current_rows
+    if offset < 0:
+        # Silinen satırlar öğrenci bloğunun altındaki satırlara taşmasın
+        action_row_idx = min(action_row_idx, start_row + num_students)
+    return action_row_idx, offset
+
+def get_sheet_shifts(sheetnames, layouts, num_students):
+    return freeze_sheet_shifts({name: get_row_shift(num_students, layout.current_rows, layout.start_row) for name, layout in zip(sheetnames, layouts)})
+
+def shift_row_dimensions(ws, action_row_idx, offset, start_row=3):
+    dimensions = {}
+    for idx, dim in list(ws.row_dimensions.items()):
+        if offset < 0 and action_row_idx <= idx < action_row_idx - offset:
+            continue
+        if idx >= action_row_idx:
+            idx += offset
+            dim.index = idx
+        dimensions[idx] = dim
+        
+    master_dim = dimensions.get(start_row)
+    if offset > 0 and master_dim is not None and master_dim.ht:
+        for r in range(action_row_idx, action_row_idx + offset):
+            inserted_dim = copy(master_dim)
+            inserted_dim.index = r
+            dimensions[r] = inserted_dim
+            
+    ws.row_dimensions.clear()
+    ws.row_dimensions.update(dimensions)
+
+def shift_merged_ranges(ws, action_row_idx, offset):
+    first_moved_row = action_row_idx - offset if offset < 0 else action_row_idx
+    for merged_range in ws.merged_cells.ranges:
+        if merged_range.min_row >= first_moved_row:
+            merged_range.shift(row_shift=offset)
+
+def get_row_position(r, start_row, last_student_row):
+    return (r == start_row, r == last_student_row)
+
+# Öğrenci bloğunda aynı kenarlık birleşimleri binlerce kez tekrar eder; her (stil, sütun, satır konumu)
+# için Border bir kez üretilip workbook'un stil tablosuna eklenir, hücreler hazır stil dizisini alır
+class StyleInterner:
+    def __init__(self, wb):
+        self.wb = wb
+        self._styles = {}
+
+    def with_border(self, key, style, make_border):
+        cache_key = (key, tuple(style))
+        interned = self._styles.get(cache_key)
+        if interned is None:
+            interned = StyleArray(style)
+            interned.borderId = self.wb._borders.add(make_border(self.wb._borders[style.borderId]))
+            self._styles[cache_key] = interned
+        return StyleArray(interned)
+
+def get_block_border(current_border, r, c, start_row, last_student_row, layout):
+    b_left = current_border.left if current_border else None
+    b_right = current_border.right if current_border else None
+    
+    if r == start_row and r == last_student_row:
+        b_top = layout.top_borders[c-1]
+        b_bottom = layout.bottom_borders[c-1]
+    elif r == start_row:
+        b_top = layout.top_borders[c-1]
+        b_bottom = layout.internal_borders[c-1]
+    elif r == last_student_row:
+        b_top = layout.internal_borders[c-1]
+        b_bottom = layout.bottom_borders[c-1]
+    else:
+        b_top = layout.internal_borders[c-1]
+        b_bottom = layout.internal_borders[c-1]
+        
+    return Border(left=b_left, right=b_right, top=b_top, bottom=b_bottom)
+
+def adjust_template_rows_and_tables(ws, num_students, current_rows, layout=None, sheet_shifts=None, styles=None, timer=NULL_TIMER):
+    start_row = 3
+    original_last_student_row = start_row + current_rows - 1
+    
+    if layout is None:
+        layout = SheetLayout(ws, current_rows, start_row)
+    if styles is None:
+        styles = StyleInterner(ws.parent)
+    actual_max_col = layout.actual_max_col
+            
+    action_row_idx, offset = get_row_shift(num_students, current_rows, start_row)
+    if sheet_shifts is None:
+        sheet_shifts = freeze_sheet_shifts({ws.title: (action_row_idx, offset)})
+    last_student_row = start_row + num_students - 1
+
+    # Başka sayfalara ait referanslar da o sayfaların kaydırmasına göre güncellenir
+    formulas_shift = any(shift_offset != 0 for _, (_, shift_offset) in sheet_shifts)
+    
+    master_formulas = layout.master_formulas
+    if formulas_shift:
+        master_formulas = {col: shift_formula_rows(formula, action_row_idx, offset, sheet_shifts) for col, formula in master_formulas.items()}
+
+    # --- TEK GEÇİŞ: SATIRLAR KAYDIRILIR, BLOK DIŞINDAKİ FORMÜLLER YENİDEN EŞLENİR ---
+    # insert_rows/delete_rows yerine hücreler yeni satırlarına doğrudan taşınır
+    old_cells = ws._cells
+    master_cells = {col: old_cells.get((start_row, col)) for col in range(1, actual_max_col + 1)}
+    new_cells = {}
+    block_cells = {}
+    
+    with timer.stage("row_shift", ws.title, len(old_cells)):
+        for (row, col), cell in old_cells.items():
+            if offset < 0 and action_row_idx <= row < action_row_idx - offset:
+                continue
+            new_row = row + offset if row >= action_row_idx else row
+            in_block = start_row <= new_row <= last_student_row and col <= actual_max_col
+        
+            # Blok içinde master satırdan yeniden yazılacak hücrelerin formülleri kaydırılmaz
+            rewritten = in_block and (col in master_formulas or col >= 5)
+            if formulas_shift and not rewritten and cell.data_type == 'f' and isinstance(cell._value, str):
+                cell._value = shift_formula_rows(cell._value, action_row_idx, offset, sheet_shifts)
+            
+            cell.row = new_row
+            if in_block:
+                block_cells[(new_row, col)] = cell
+            else:
+                new_cells[(new_row, col)] = cell
+
+    # --- ÖĞRENCİ BLOĞU: HER HÜCREYE STİL, KENARLIK VE DEĞER BİR KEZ YAZILIR ---
+    # Formül doldurma ve kenarlıklar aynı hücre döngüsünde yapıldığı için tek aşama olarak ölçülür
+    with timer.stage("student_block", ws.title, num_students * actual_max_col):
+        for r in range(start_row, last_student_row + 1):
+            inserted = offset > 0 and action_row_idx <= r < action_row_idx + offset
+        
+            for c in range(1, actual_max_col + 1):
+                target_cell = None if inserted else block_cells.get((r, c))
+                if target_cell is None:
+                    target_cell = Cell(ws, row=r, column=c)
+                    master_cell = master_cells[c]
+                    if inserted and master_cell is not None and master_cell.has_style:
+                        target_cell._style = copy(master_cell._style)
+                    
+                position = get_row_position(r, start_row, last_student_row)
+                target_cell._style = styles.with_border(("block", ws.title, c, position), target_cell._style,
+                                                        lambda border: get_block_border(border, r, c, start_row, last_student_row, layout))
+            
+                formula = master_formulas.get(c)
+                if formula and r == start_row:
+                    target_cell.value = formula
+                elif formula:
+                    # Formül bir kez tokenize edilir, her öğrenci satırı önbellekteki şablondan üretilir
+                    try:
+                        target_cell.value = translate_formula_rows(formula, start_row, r)
+                    except:
+                        target_cell.value = formula
+                elif c >= 5:
+                    target_cell.value = None
+                
+                new_cells[(r, c)] = target_cell
+            
+    ws._cells = new_cells
+    
+    if offset != 0:
+        shift_row_dimensions(ws, action_row_idx, offset, start_row)
+        shift_merged_ranges(ws, action_row_idx, offset)
+
+    for table in ws.tables.values():
+        ref = layout.table_refs.get(table.name, table.ref)
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        table_offset = max_row - original_last_student_row
+        if table_offset < 0:
+            table_offset = 0
+        new_table_max_row = last_student_row + table_offset
+        table.ref = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{new_table_max_row}"
+
+    if hasattr(ws, 'conditional_formatting') and hasattr(ws.conditional_formatting, '_cf_rules'):
+        ws.conditional_formatting._cf_rules.clear()
+        
+    if hasattr(ws, 'extLst'):
+        ws.extLst = None
+
+    return last_student_row, actual_max_col
+
+def get_level_prefix(class_name):
+    return class_name.split(".")[0].upper()
+
+def get_thick_cols(level_prefix, sheet_name):
+    return get_format_plan(level_prefix).thick_cols(sheet_name)
+
+def get_thick_border(current_b, r, c, start_row, last_student_row, thick_cols):
+    thick_side = Side(border_style="medium", color="000000")
+    thin_side = Side(border_style="thin", color="000000")
+    
+    b_top = current_b.top if current_b and current_b.top and current_b.top.style else thin_side
+    b_bottom = current_b.bottom if current_b and current_b.bottom and current_b.bottom.style else thin_side
+    
+    if r > start_row:
+        b_top = thin_side
+    if r < last_student_row:
+        b_bottom = thin_side
+        
+    b_left = thin_side
+    b_right = thin_side
+    
+    if c in thick_cols:
+        b_left = thick_side
+        b_right = thick_side
+        if r == start_row:
+            b_top = thick_side
+        if r == last_student_row:
+            b_bottom = thick_side
+            
+    return Border(top=b_top, bottom=b_bottom, left=b_left, right=b_right)
+
+def get_title_font(current_font):
+    if current_font:
+        return Font(name=current_font.name, size=20, bold=current_font.bold, italic=current_font.italic, color=current_font.color)
+    return Font(size=20, bold=True)
+
+def add_sheet_conditional_formats(conditional_formatting, level_prefix, sheet_name, last_student_row):
+    apply_formats(conditional_formatting, get_format_plan(level_prefix).sheet_formats(sheet_name), last_student_row)
+
+def add_first_sheet_conditional_formats(conditional_formatting, first_sheet_last_row, level_prefix=None):
+    apply_formats(conditional_formatting, get_format_plan(level_prefix).first_sheet, first_sheet_last_row)
+
+# Kenarlık/koşullu biçim adımları hem yeni oluşturmada hem mevcut gradebook güncellemesinde kullanılır
+def finish_class_sheet(ws, level_prefix, last_student_row, actual_max_col, styles, timer=NULL_TIMER, start_row=3):
+    sheet_name = ws.title
+    thick_cols = get_thick_cols(level_prefix, sheet_name)
+    if thick_cols:
+        with timer.stage("thick_borders", sheet_name, (last_student_row - start_row + 1) * max(0, actual_max_col - 4)):
+            for r in range(start_row, last_student_row + 1):
+                for c in range(5, actual_max_col + 1):
+                    target_cell = ws.cell(row=r, column=c)
+                    thick_key = ("thick", c in thick_cols, get_row_position(r, start_row, last_student_row))
+                    target_cell._style = styles.with_border(thick_key, target_cell._style,
+                                                            lambda border: get_thick_border(border, r, c, start_row, last_student_row, thick_cols))
+
+    with timer.stage("conditional_formats", sheet_name):
+        add_sheet_conditional_formats(ws.conditional_formatting, level_prefix, sheet_name, last_student_row)
+
+# Satır-sütun sırasıyla ilk "Advisor" hücresi; iter_rows gibi boş hücre oluşturmadan sadece mevcut hücrelere bakılır
+def find_advisor_cell(ws):
+    found = None
+    for key, cell in ws._cells.items():
+        if isinstance(cell._value, str) and "Advisor" in cell._value and (found is None or key < found):
+            found = key
+    return ws._cells[found] if found is not None else None
+
+def fill_first_sheet(first_sheet, students, advisor_name, first_sheet_last_row, timer=NULL_TIMER, start_row=3, level_prefix=None):
+    first_sheet_name = first_sheet.title
+    with timer.stage("advisor_search", first_sheet_name, len(first_sheet._cells)):
+        advisor_cell = find_advisor_cell(first_sheet)
+        if advisor_cell is not None:
+            advisor_cell.value = f"Advisor: {advisor_name}"
+    
+    with timer.stage("students", first_sheet_name, len(students) * 4):
+        for i, student in enumerate(students):
+            first_sheet.cell(row=start_row + i, column=1, value=student["index"])
+            first_sheet.cell(row=start_row + i, column=2, value=student["number"])
+            first_sheet.cell(row=start_row + i, column=3, value=student["name"])
+            first_sheet.cell(row=start_row + i, column=4, value=student["surname"])
+        
+    with timer.stage("conditional_formats", first_sheet_name):
+        add_first_sheet_conditional_formats(first_sheet.conditional_formatting, first_sheet_last_row, level_prefix)
+
+def protect_and_save(wb, level_prefix, timer=NULL_TIMER):
+    with timer.stage("protection", cells=len(wb.worksheets)):
+        password_hash = get_format_plan(level_prefix).password_hash
+        for ws_to_protect in wb.worksheets:
+            ws_to_protect.protection.sheet = True
+            ws_to_protect.protection.set_password(password_hash, already_hashed=True)
+            
+        wb.security = WorkbookProtection(lockStructure=True)
+        
+    with timer.stage("save"):
+        output = io.BytesIO()
+        wb.save(output)
+        output.seek(0)
+        return output.read()
+
+def process_class_template(template_bytes, class_name, students, module_name, advisor_name, timer=NULL_TIMER):
+    with timer.stage("load_template"):
+        compiled = get_compiled_template(template_bytes)
+        wb = compiled.new_workbook()
+    
+    wb.template = False 
+    try:
+        if hasattr(wb, 'file_sharing'):
+            wb.file_sharing = FileSharing(readOnlyRecommended=False)
+        else:
+            wb.file_sharing = FileSharing(readOnlyRecommended=False)
+    except:
+        pass
+    
+    start_row = 3
+    first_sheet_last_row = 3
+    level_prefix = get_level_prefix(class_name)
+    
+    sheet_shifts = get_sheet_shifts(compiled.sheetnames, compiled.layouts, len(students))
+    styles = StyleInterner(wb)
+    
+    for i, sheet_name in enumerate(wb.sheetnames):
+        ws = wb[sheet_name]
+        layout = compiled.layouts[i]
+        last_student_row, actual_max_col = adjust_template_rows_and_tables(ws, len(students), layout.current_rows, layout, sheet_shifts, styles, timer)
+        
+        if i == 0:
+            first_sheet_last_row = last_student_row
+            
+        if i > 0:
+            finish_class_sheet(ws, level_prefix, last_student_row, actual_max_col, styles, timer, start_row)
+        
+    first_sheet = wb.worksheets[0]
+    first_sheet.title = class_name
+    
+    first_sheet["A1"] = f"{class_name} - {module_name}"
+    first_sheet["A1"].font = get_title_font(first_sheet["A1"].font)
+        
+    first_sheet_name = first_sheet.title
+    for i in range(1, len(wb.worksheets)):
+        wb.worksheets[i]["A1"].value = f"='{first_sheet_name}'!A1"
+    
+    fill_first_sheet(first_sheet, students, advisor_name, first_sheet_last_row, timer, start_row, level_prefix)
+    return protect_and_save(wb, level_prefix, timer)
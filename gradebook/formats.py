@@ -0,0 +1,146 @@
+import hashlib
+import json
+
+from openpyxl.styles import Font, PatternFill
+from openpyxl.formatting.rule import Rule, IconSet, FormatObject, CellIsRule, FormulaRule
+from openpyxl.utils.protection import hash_password
+
+PASSWORDS = {
+    "A1": "Esra",
+    "A2": "Ceren",
+    "B1": "Anna",
+    "B2": "Berk"
+}
+
+def get_level_password(level_prefix):
+    return PASSWORDS.get(level_prefix, "1234")
+
+# --- KOŞULLU BİÇİM KURALLARI: EŞİKLER VE RENKLER SADECE BU TABLOLARDAN DEĞİŞTİRİLİR ---
+WHITE_BOLD = {"color": "FFFFFF", "bold": True}
+WHITE_BOLD_UNDERLINE = {"color": "FFFFFF", "bold": True, "underline": "single"}
+
+FORMAT_RULES = {
+    "arrows_100": {"type": "iconSet", "iconSet": "5Arrows", "values": [0, 45, 60, 70, 85]},
+    "arrows_32": {"type": "iconSet", "iconSet": "5Arrows", "values": [0, 8, 16, 24, 32]},
+    "arrows_24": {"type": "iconSet", "iconSet": "5Arrows", "values": [0, 6, 12, 18, 24]},
+    "arrows_16": {"type": "iconSet", "iconSet": "5Arrows", "values": [0, 4, 8, 12, 16]},
+    "arrows_12": {"type": "iconSet", "iconSet": "5Arrows", "values": [0, 3, 6, 9, 12]},
+    "lights_50": {"type": "iconSet", "iconSet": "3TrafficLights1", "values": [0, 46.99, 49.99]},
+    "symbols_60": {"type": "iconSet", "iconSet": "3Symbols2", "values": [0, 56.99, 59.5]},
+    "diff_ns": {"type": "expression", "formula": "ABS($N3-$S3)>6", "fill": "FF000000", "font": WHITE_BOLD_UNDERLINE},
+    "diff_ty": {"type": "expression", "formula": "ABS($T3-$Y3)>6", "fill": "FF000000", "font": WHITE_BOLD_UNDERLINE},
+    "positive": {"type": "cellIs", "operator": "greaterThan", "formula": "0", "fill": "FF1B587C", "font": WHITE_BOLD},
+    "grade_F": {"type": "cellIs", "operator": "equal", "formula": '"F"', "fill": "FFCC0000", "font": WHITE_BOLD, "stopIfTrue": True},
+    "grade_C": {"type": "cellIs", "operator": "equal", "formula": '"C"', "fill": "FF4E8542", "font": WHITE_BOLD, "stopIfTrue": True},
+    "grade_B": {"type": "cellIs", "operator": "equal", "formula": '"B"', "fill": "FF1B587C", "font": WHITE_BOLD, "stopIfTrue": True},
+    "grade_A": {"type": "cellIs", "operator": "equal", "formula": '"A"', "fill": "FFFFCC00", "font": WHITE_BOLD, "stopIfTrue": True}
+}
+
+# (sütunlar, kural) girdileri sırayla eklenir; aynı girdideki sütunlar tek kuralı (ve önceliği) paylaşır
+FIRST_SHEET_FORMATS = [
+    (["E", "F", "M"], "arrows_100"),
+    (["L"], "lights_50"),
+    (["N"], "symbols_60"),
+    (["O"], "grade_F"),
+    (["O"], "grade_C"),
+    (["O"], "grade_B"),
+    (["O"], "grade_A")
+]
+
+# İlk sayfa dışındaki tüm sayfalara, sayfaya özel kurallardan önce eklenir
+ALL_SHEETS_FORMATS = [
+    (["E"], "arrows_100")
+]
+
+# seviye -> sayfa adı (küçük harf) -> girdiler; seviyede tanımı olmayan sayfalar için "*" kullanılır
+SHEET_FORMATS = {
+    "*": {
+        "midterm": [(["I"], "arrows_16"), (["N", "S"], "diff_ns"), (["N", "S"], "arrows_32"), (["X"], "positive")]
+    },
+    "A1": {
+        "met": [(["N", "S"], "diff_ns"), (["N", "S"], "arrows_32"), (["X"], "positive")]
+    },
+    "A2": {
+        "met": [(["T", "Y"], "diff_ty"), (["T", "Y"], "arrows_32"), (["AD"], "positive"), (["I", "O"], "arrows_12")]
+    },
+    "B1": {
+        "met": [(["T", "Y"], "diff_ty"), (["T", "Y"], "arrows_32"), (["AD"], "positive"), (["I", "O"], "arrows_16")]
+    },
+    "B2": {
+        "midterm": [(["I"], "arrows_24"), (["N", "S"], "diff_ns"), (["N", "S"], "arrows_32"), (["X"], "positive")],
+        "met": [(["T", "Y"], "diff_ty"), (["T", "Y"], "arrows_32"), (["AD"], "positive"), (["I", "O"], "arrows_16")]
+    }
+}
+
+# Kalın dikey kenarlık çizilecek sütun numaraları
+THICK_COLUMNS = {
+    "B1": {
+        "midterm": [5, 9, 14, 19, 24],
+        "met": [5, 9, 15, 20, 25, 30]
+    }
+}
+
+# Tablolar değişince önbellekteki eski gradebook'lar kullanılmasın diye önbellek anahtarına eklenir
+def format_tables_digest():
+    tables = [PASSWORDS, FORMAT_RULES, FIRST_SHEET_FORMATS, ALL_SHEETS_FORMATS, SHEET_FORMATS, THICK_COLUMNS]
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode("utf-8")).hexdigest()
+
+def build_format_rule(spec):
+    if spec["type"] == "iconSet":
+        cfvo = [FormatObject(type='num', val=v) for v in spec["values"]]
+        return Rule(type='iconSet', iconSet=IconSet(iconSet=spec["iconSet"], cfvo=cfvo))
+    fill = PatternFill(start_color=spec["fill"], end_color=spec["fill"], fill_type="solid")
+    font = Font(**spec["font"])
+    if spec["type"] == "expression":
+        return FormulaRule(formula=[spec["formula"]], stopIfTrue=spec.get("stopIfTrue", False), fill=fill, font=font)
+    if spec["type"] == "cellIs":
+        return CellIsRule(operator=spec["operator"], formula=[spec["formula"]], stopIfTrue=spec.get("stopIfTrue", False), fill=fill, font=font)
+    raise ValueError(f"Bilinmeyen koşullu biçim tipi: {spec['type']}")
+
+# --- SEVİYE BAŞINA BİR KEZ DERLENEN PLAN: KURALLAR VE ŞİFRE ÖZETİ SINIFLAR ARASINDA PAYLAŞILIR ---
+class FormatPlan:
+    def __init__(self, level_prefix):
+        self.level_prefix = level_prefix
+        self.password_hash = hash_password(get_level_password(level_prefix))
+        self._rules = {}
+        self.first_sheet = self._compile(FIRST_SHEET_FORMATS)
+        self.all_sheets = self._compile(ALL_SHEETS_FORMATS)
+        level_formats = SHEET_FORMATS.get(level_prefix, {})
+        self.sheets = {}
+        for sheet_name in set(SHEET_FORMATS["*"]) | set(level_formats):
+            entries = level_formats.get(sheet_name, SHEET_FORMATS["*"].get(sheet_name, []))
+            self.sheets[sheet_name] = self.all_sheets + self._compile(entries)
+        self.thick_columns = THICK_COLUMNS.get(level_prefix, {})
+
+    def _compile(self, entries):
+        compiled = []
+        for columns, name in entries:
+            if name not in self._rules:
+                self._rules[name] = build_format_rule(FORMAT_RULES[name])
+            compiled.append((columns, self._rules[name]))
+        return compiled
+
+    def sheet_formats(self, sheet_name):
+        return self.sheets.get(sheet_name.lower(), self.all_sheets)
+
+    def thick_cols(self, sheet_name):
+        return self.thick_columns.get(sheet_name.lower())
+
+_format_plans = {}
+
+def get_format_plan(level_prefix):
+    plan = _format_plans.get(level_prefix)
+    if plan is None:
+        plan = _format_plans[level_prefix] = FormatPlan(level_prefix)
+    return plan
+
+# Öncelik ve dxfId çalışma anında kurala yazıldığı için her sayfaya ince bir Rule kopyası eklenir;
+# ikon setleri, biçimler ve formüller plandaki nesnelerle paylaşılır
+def _rule_instance(rule):
+    return Rule(type=rule.type, operator=rule.operator, formula=rule.formula, stopIfTrue=rule.stopIfTrue, iconSet=rule.iconSet, dxf=rule.dxf)
+
+def apply_formats(conditional_formatting, entries, last_row, start_row=3):
+    for columns, rule in entries:
+        instance = _rule_instance(rule)
+        for column in columns:
+            conditional_formatting.add(f"{column}{start_row}:{column}{last_row}", instance)
@@ -0,0 +1,135 @@
+import re
+from functools import lru_cache
+
+from openpyxl.formula.tokenizer import Tokenizer, Token
+
+# Aynı template formülleri her sınıfta tekrar ettiği için önbellek süreç boyunca paylaşılır
+FORMULA_CACHE_SIZE = 32768
+
+_CELL_RE = re.compile(r"^(\$?[A-Za-z]{1,3})(\$?)(\d+)$")
+_ROW_RE = re.compile(r"^(\$?)(\d+)$")
+_COL_RE = re.compile(r"^\$?[A-Za-z]{1,3}$")
+
+def normalize_sheet_name(sheet_name):
+    return sheet_name.lower()
+
+def _split_sheet(ref):
+    if "!" not in ref:
+        return "", None, ref
+    prefix, _, range_part = ref.rpartition("!")
+    sheet_name = prefix
+    if sheet_name.startswith("'") and sheet_name.endswith("'"):
+        sheet_name = sheet_name[1:-1].replace("''", "'")
+    return prefix + "!", normalize_sheet_name(sheet_name), range_part
+
+def _range_segments(ref):
+    # Hücre/satır/sütun referansı değilse (tablo, isim, dış bağlantı vb.) None döner ve token olduğu gibi kalır
+    prefix, sheet_name, range_part = _split_sheet(ref)
+    segments = [prefix] if prefix else []
+    for i, part in enumerate(range_part.split(":")):
+        if i > 0:
+            segments.append(":")
+        cell_match = _CELL_RE.match(part)
+        if cell_match:
+            segments.append(cell_match.group(1) + cell_match.group(2))
+            segments.append((sheet_name, int(cell_match.group(3)), cell_match.group(2) == "$"))
+            continue
+        row_match = _ROW_RE.match(part)
+        if row_match:
+            segments.append(row_match.group(1))
+            segments.append((sheet_name, int(row_match.group(2)), row_match.group(1) == "$"))
+            continue
+        if _COL_RE.match(part):
+            segments.append(part)
+            continue
+        return None
+    return segments
+
+# Formülün bir kez tokenize edilmiş hali: sabit metin parçaları ve (sayfa, satır, mutlak) satır yuvaları
+class FormulaTemplate:
+    __slots__ = ("segments", "has_refs")
+
+    def __init__(self, segments):
+        merged = []
+        for segment in segments:
+            if isinstance(segment, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += segment
+            elif segment != "":
+                merged.append(segment)
+        self.segments = tuple(merged)
+        self.has_refs = any(not isinstance(segment, str) for segment in merged)
+
+    def render(self, row_for):
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+            else:
+                parts.append(str(row_for(*segment)))
+        return "".join(parts)
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def compile_formula(formula_str):
+    try:
+        tokens = Tokenizer(formula_str).items
+    except Exception:
+        return None
+
+    segments = ["="]
+    for token in tokens:
+        if token.type == Token.OPERAND and token.subtype == Token.RANGE:
+            range_segments = _range_segments(token.value)
+            if range_segments is not None:
+                segments.extend(range_segments)
+                continue
+        segments.append(token.value)
+    return FormulaTemplate(segments)
+
+def freeze_sheet_shifts(sheet_shifts):
+    if sheet_shifts is None or isinstance(sheet_shifts, tuple):
+        return sheet_shifts
+    return tuple(sorted((normalize_sheet_name(name), tuple(shift)) for name, shift in sheet_shifts.items()))
+
+def _is_formula(formula_str):
+    return bool(formula_str) and isinstance(formula_str, str) and formula_str.startswith('=')
+
+# sheet_shifts verilirse başka sayfaya ait referanslar o sayfanın (eşik, kaydırma) değerine göre kayar;
+# verilmezse eski davranış gibi tüm referanslar aynı değerle kayar
+def shift_formula_rows(formula_str, threshold_row, offset, sheet_shifts=None):
+    if not _is_formula(formula_str) or offset == 0 and not sheet_shifts:
+        return formula_str
+    return _shift_formula_rows(formula_str, threshold_row, offset, freeze_sheet_shifts(sheet_shifts))
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _shift_formula_rows(formula_str, threshold_row, offset, sheet_shifts):
+    template = compile_formula(formula_str)
+    if template is None or not template.has_refs:
+        return formula_str
+    shifts = dict(sheet_shifts) if sheet_shifts is not None else None
+
+    def row_for(sheet_name, row, absolute):
+        row_threshold, row_offset = threshold_row, offset
+        if sheet_name is not None and shifts is not None:
+            if sheet_name not in shifts:
+                return row
+            row_threshold, row_offset = shifts[sheet_name]
+        if row >= row_threshold:
+            return row + row_offset
+        return row
+
+    return template.render(row_for)
+
+# Aşağı doğru doldurma: Translator gibi sadece göreli ($ olmayan) satırlar kayar, sütunlar aynı kalır
+def translate_formula_rows(formula_str, origin_row, target_row):
+    if not _is_formula(formula_str) or origin_row == target_row:
+        return formula_str
+    return _translate_formula_rows(formula_str, target_row - origin_row)
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _translate_formula_rows(formula_str, delta):
+    template = compile_formula(formula_str)
+    if template is None:
+        raise ValueError(f"Formül çözümlenemedi: {formula_str}")
+    if not template.has_refs:
+        return formula_str
+    return template.render(lambda sheet_name, row, absolute: row if absolute else row + delta)
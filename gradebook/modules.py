@@ -0,0 +1,37 @@
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+# Çok modüllü çalıştırmada sınıf bir kez bu başlıkla oluşturulur; modüller arasında sadece A1 başlığı farklıdır
+MODULE_PLACEHOLDER = "__GRADEBOOK_MODULE__"
+
+def parse_module_names(text):
+    names = []
+    for name in text.split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+# Başlığı taşıyan parça (openpyxl'de sharedStrings.xml, ooxml'de ilk sayfa) modül adıyla yamalanır,
+# diğer parçalar olduğu gibi yeniden yazılır
+def iter_module_variants(gradebook_bytes, module_names):
+    with zipfile.ZipFile(io.BytesIO(gradebook_bytes)) as archive:
+        infos = archive.infolist()
+        parts = {info.filename: archive.read(info.filename) for info in infos}
+
+    token = MODULE_PLACEHOLDER.encode("utf-8")
+    title_parts = [name for name, data in parts.items() if token in data]
+    if not title_parts:
+        raise ValueError("Modül başlığı oluşturulan dosyada bulunamadı")
+
+    for module_name in module_names:
+        module_xml = escape(module_name).encode("utf-8")
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as variant:
+            for info in infos:
+                data = parts[info.filename]
+                if info.filename in title_parts:
+                    data = data.replace(token, module_xml)
+                variant.writestr(info.filename, data)
+        yield module_name, output.getvalue()
@@ -0,0 +1,776 @@
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from copy import copy
+from xml.sax.saxutils import escape
+
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.formula.translate import Translator
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.workbook.protection import WorkbookProtection, FileSharing
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.protection import SheetProtection
+from openpyxl.xml.functions import tostring
+
+from .core import (
+    get_compiled_template, process_class_template, get_sheet_shifts, get_row_shift, get_row_position, get_block_border,
+    get_thick_cols, get_thick_border, get_title_font, get_level_prefix,
+    add_sheet_conditional_formats, add_first_sheet_conditional_formats,
+)
+from .formats import get_format_plan
+from .formulas import shift_formula_rows, translate_formula_rows
+from .timing import NULL_TIMER
+
+# --- OPENPYXL NESNE MODELİNİ ATLAYAN DOĞRUDAN OOXML YAMALAMA ---
+# Sadece sheetN.xml, tableN.xml, workbook.xml, styles.xml ve paket tanımları yeniden yazılır;
+# diğer tüm parçalar (tema, çizimler, resimler, docProps...) template'ten aynen kopyalanır.
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+TEMPLATE_MAIN_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml"
+SHEET_MAIN_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+
+# CT_Worksheet içinde conditionalFormatting'den sonra gelebilecek elemanlar
+_AFTER_CONDITIONAL_FORMATTING = [
+    "dataValidations", "hyperlinks", "printOptions", "pageMargins", "pageSetup", "headerFooter",
+    "rowBreaks", "colBreaks", "customProperties", "cellWatches", "ignoredErrors", "smartTags",
+    "drawing", "legacyDrawing", "legacyDrawingHF", "picture", "oleObjects", "controls",
+    "webPublishItems", "tableParts", "extLst",
+]
+_AFTER_DXFS = ["tableStyles", "colors", "extLst"]
+
+class UnsupportedTemplateError(Exception):
+    pass
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _qname(name, prefixes):
+    if name[0] != "{":
+        return name
+    uri, local = name[1:].split("}", 1)
+    if uri not in prefixes:
+        raise UnsupportedTemplateError(f"Tanımsız XML namespace: {uri}")
+    prefix = prefixes[uri]
+    return f"{prefix}:{local}" if prefix else local
+
+def _attr_xml(attrib, prefixes, skip=()):
+    return "".join(f' {_qname(k, prefixes)}="{escape(v, {chr(34): "&quot;"})}"' for k, v in attrib.items() if k not in skip)
+
+def _serialize(el, prefixes):
+    tag = _qname(el.tag, prefixes)
+    parts = [f"<{tag}{_attr_xml(el.attrib, prefixes)}"]
+    if len(el) == 0 and not el.text:
+        parts.append("/>")
+    else:
+        parts.append(">")
+        if el.text:
+            parts.append(escape(el.text))
+        for child in el:
+            parts.append(_serialize(child, prefixes))
+            if child.tail:
+                parts.append(escape(child.tail))
+        parts.append(f"</{tag}>")
+    return "".join(parts)
+
+def _to_xml(obj, tagname=None):
+    tree = obj.to_tree(tagname) if tagname else obj.to_tree()
+    return tostring(tree).decode("utf-8")
+
+def _root_prefixes(xml_text):
+    start = re.search(r"<(?![?!])[^>]*>", xml_text)
+    prefixes = {XML_NS: "xml"}
+    for prefix, uri in re.findall(r'xmlns(?::([\w.-]+))?="([^"]*)"', start.group(0)):
+        prefixes[uri] = prefix
+    return prefixes
+
+def _resolve(source_part, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+def _rels_path(part):
+    return posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+
+def _read_rels(parts, part):
+    rels = {}
+    data = parts.get(_rels_path(part))
+    if data is None:
+        return rels
+    for rel in ET.fromstring(data):
+        if rel.get("TargetMode") == "External":
+            continue
+        rels[rel.get("Id")] = (rel.get("Type"), _resolve(part, rel.get("Target")))
+    return rels
+
+def _value_parts(value):
+    # (t, formül, <v> xml, <is> xml) — openpyxl'in Cell.value ataması ile aynı tip kararları
+    if value is None:
+        return None, None, "", ""
+    if isinstance(value, bool):
+        return "b", None, f"<v>{int(value)}</v>", ""
+    if isinstance(value, (int, float)):
+        return None, None, f"<v>{value}</v>", ""
+    value = str(value)
+    if value.startswith("=") and len(value) > 1:
+        return None, value, "", ""
+    space = ' xml:space="preserve"' if value != value.strip() else ""
+    return "inlineStr", None, "", f"<is><t{space}>{escape(value)}</t></is>"
+
+class _XmlCell:
+    __slots__ = ("style", "t", "attrs", "formula", "value_xml", "inline_xml", "extra_xml")
+
+    def __init__(self, style=0, t=None, attrs="", formula=None, value_xml="", inline_xml="", extra_xml=""):
+        self.style = style
+        self.t = t
+        self.attrs = attrs
+        self.formula = formula
+        self.value_xml = value_xml
+        self.inline_xml = inline_xml
+        self.extra_xml = extra_xml
+
+    def copy(self):
+        return _XmlCell(self.style, self.t, self.attrs, self.formula, self.value_xml, self.inline_xml, self.extra_xml)
+
+    def set_value(self, value):
+        self.t, self.formula, self.value_xml, self.inline_xml = _value_parts(value)
+
+    def text(self, shared_strings):
+        if self.formula:
+            return self.formula
+        if self.t == "s" and self.value_xml:
+            return shared_strings[int(re.sub(r"<[^>]*>", "", self.value_xml))]
+        if self.t == "inlineStr":
+            return re.sub(r"<[^>]*>", "", self.inline_xml)
+        if self.t == "str":
+            return re.sub(r"<[^>]*>", "", self.value_xml)
+        return None
+
+    def render(self, coordinate):
+        parts = [f'<c r="{coordinate}"']
+        if self.style:
+            parts.append(f' s="{self.style}"')
+        if self.formula:
+            parts.append(self.attrs)
+            parts.append(">")
+            parts.append(f"<f>{escape(self.formula[1:])}</f>")
+            parts.append(self.extra_xml)
+            parts.append("</c>")
+            return "".join(parts)
+        if self.t:
+            parts.append(f' t="{self.t}"')
+        parts.append(self.attrs)
+        body = self.value_xml + self.inline_xml + self.extra_xml
+        if body:
+            parts.append(f">{body}</c>")
+        else:
+            parts.append("/>")
+        return "".join(parts)
+
+_ANCHORED_REF = re.compile(r'<(?:hyperlink|dataValidation|autoFilter|protectedRange)\b[^>]*?\b(?:ref|sqref)="([^"]+)"')
+_COMMENT_REF = re.compile(r'<(?:\w+:)?(?:comment|threadedComment)\b[^>]*?\bref="([^"]+)"')
+# Sadece worksheet düzeyindeki (</worksheet>'ten hemen önceki) extLst; customSheetView gibi elemanların içindekilere dokunulmaz
+_WORKSHEET_EXT_LIST = re.compile(r"(?:<extLst\b[^>]*/>|<extLst\b[^>]*(?<!/)>(?:(?!<extLst\b).)*?</extLst>)(?=\s*</worksheet>)", re.S)
+
+class _XmlSheet:
+    def __init__(self, name, path, xml_text, parts):
+        self.name = name
+        self.path = path
+        self.prefixes = _root_prefixes(xml_text)
+        if self.prefixes.get(MAIN_NS) != "":
+            raise UnsupportedTemplateError("Worksheet ana namespace'i varsayılan değil")
+
+        match = re.search(r"<sheetData\s*/>|<sheetData\b[^>]*>.*?</sheetData>", xml_text, re.S)
+        if match is None:
+            raise UnsupportedTemplateError("sheetData bulunamadı")
+        self.head = xml_text[:match.start()]
+        self.tail = xml_text[match.end():]
+
+        root = ET.fromstring(xml_text)
+        self.rows = {}
+        shared_formulas = {}
+        for row_el in root.find(f"{{{MAIN_NS}}}sheetData"):
+            row_idx = int(row_el.get("r"))
+            cells = {}
+            next_col = 1
+            for c_el in row_el:
+                if _local(c_el.tag) != "c":
+                    continue
+                coordinate = c_el.get("r")
+                if coordinate:
+                    col = column_index_from_string(coordinate_from_string(coordinate)[0])
+                else:
+                    col = next_col
+                    coordinate = f"{get_column_letter(col)}{row_idx}"
+                next_col = col + 1
+                cells[col] = self._parse_cell(c_el, coordinate, shared_formulas)
+            self.rows[row_idx] = (_attr_xml(row_el.attrib, self.prefixes, skip=("r", "spans")), cells)
+
+        protection = re.search(r"<sheetProtection\b[^>]*/>", self.tail)
+        self.protection_xml = protection.group(0) if protection else None
+        merge_cells = re.search(r"<mergeCells\b.*?</mergeCells>", self.tail, re.S)
+        self.merged_ranges = re.findall(r'<mergeCell\s+ref="([^"]+)"', merge_cells.group(0)) if merge_cells else []
+        # Template'in koruma, koşullu biçim ve extLst bölümleri her sınıfta yeniden yazıldığı için bir kez çıkarılır
+        self.tail = re.sub(r"<sheetProtection\b[^>]*/>", "", self.tail)
+        self.tail = re.sub(r"<conditionalFormatting\b.*?</conditionalFormatting>", "", self.tail, flags=re.S)
+        self.tail = _WORKSHEET_EXT_LIST.sub("", self.tail, count=1)
+        self._protections = {}
+
+        self.tables = []
+        # Yorumlar, köprüler ve veri doğrulamaları satır numarasıyla bağlıdır; bu yama yolu onları kaydırmaz
+        anchored_refs = _ANCHORED_REF.findall(self.tail)
+        for rel_type, target in _read_rels(parts, path).values():
+            if rel_type == REL_TYPE + "table":
+                self.tables.append(target)
+            elif rel_type == REL_TYPE + "comments" or rel_type.endswith("/threadedComment"):
+                anchored_refs += _COMMENT_REF.findall(parts[target].decode("utf-8")) if target in parts else []
+        self.anchored_max_row = 0
+        for sqref in anchored_refs:
+            for ref in sqref.split():
+                max_row = range_boundaries(ref)[3]
+                if max_row is not None:
+                    self.anchored_max_row = max(self.anchored_max_row, max_row)
+
+    # openpyxl tarafında hesaplanan kullanılan alanın dışındaki boş hücreler ve satırlar atılır
+    def trim(self, max_row, max_col):
+        for row_idx in [row_idx for row_idx in self.rows if row_idx > max_row]:
+            del self.rows[row_idx]
+        for row_attrs, cells in self.rows.values():
+            for col in [col for col in cells if col > max_col]:
+                del cells[col]
+
+    # Seviye şifresinin özeti FormatPlan'da bir kez hesaplanır; sayfa koruma XML'i özet başına bir kez üretilir
+    def protection_xml_for(self, password_hash):
+        xml = self._protections.get(password_hash)
+        if xml is None:
+            protection = SheetProtection.from_tree(ET.fromstring(self.protection_xml.replace("<sheetProtection", f'<sheetProtection xmlns="{MAIN_NS}"', 1))) if self.protection_xml else SheetProtection()
+            protection.sheet = True
+            protection.set_password(password_hash, already_hashed=True)
+            xml = self._protections[password_hash] = _to_xml(protection)
+        return xml
+
+    def _parse_cell(self, c_el, coordinate, shared_formulas):
+        cell = _XmlCell(style=int(c_el.get("s", 0)), t=c_el.get("t"), attrs=_attr_xml(c_el.attrib, self.prefixes, skip=("r", "s", "t")))
+        extra = []
+        for child in c_el:
+            tag = _local(child.tag)
+            if tag == "f":
+                formula_type = child.get("t", "normal")
+                if formula_type == "shared":
+                    si = child.get("si")
+                    if child.text:
+                        shared_formulas[si] = ("=" + child.text, coordinate)
+                        cell.formula = "=" + child.text
+                    elif si in shared_formulas:
+                        master_formula, origin = shared_formulas[si]
+                        cell.formula = Translator(master_formula, origin=origin).translate_formula(coordinate)
+                    else:
+                        raise UnsupportedTemplateError(f"Paylaşılan formül kaynağı yok: {coordinate}")
+                elif formula_type == "normal" and child.text:
+                    cell.formula = "=" + child.text
+                else:
+                    raise UnsupportedTemplateError(f"Desteklenmeyen formül tipi ({formula_type}): {coordinate}")
+            elif tag == "v":
+                cell.value_xml = _serialize(child, self.prefixes)
+            elif tag == "is":
+                cell.inline_xml = _serialize(child, self.prefixes)
+            else:
+                extra.append(_serialize(child, self.prefixes))
+        cell.extra_xml = "".join(extra)
+        if cell.formula:
+            cell.t = None
+            cell.value_xml = ""
+        return cell
+
+# --- TEMPLATE PAKETİ: SEVİYE BAŞINA BİR KEZ AYRIŞTIRILIR ---
+class OoxmlPackage:
+    def __init__(self, compiled):
+        self.compiled = compiled
+        with zipfile.ZipFile(io.BytesIO(compiled.template_bytes)) as archive:
+            self.infos = archive.infolist()
+            self.parts = {info.filename: archive.read(info.filename) for info in self.infos}
+
+        root_rels = _read_rels(self.parts, "")
+        workbook_paths = [target for rel_type, target in root_rels.values() if rel_type == REL_TYPE + "officeDocument"]
+        if not workbook_paths:
+            raise UnsupportedTemplateError("officeDocument ilişkisi bulunamadı")
+        self.workbook_path = workbook_paths[0]
+        self.workbook_xml = self.parts[self.workbook_path].decode("utf-8")
+        workbook_rels = _read_rels(self.parts, self.workbook_path)
+
+        self.styles_path = None
+        self.calc_chain_path = None
+        shared_strings_path = None
+        for rel_type, target in workbook_rels.values():
+            if rel_type == REL_TYPE + "styles":
+                self.styles_path = target
+            elif rel_type == REL_TYPE + "sharedStrings":
+                shared_strings_path = target
+            elif rel_type == REL_TYPE + "calcChain":
+                self.calc_chain_path = target
+            elif rel_type == REL_TYPE + "chartsheet":
+                raise UnsupportedTemplateError("Grafik sayfaları desteklenmiyor")
+        if self.styles_path is None:
+            raise UnsupportedTemplateError("styles.xml bulunamadı")
+
+        self.shared_strings = []
+        if shared_strings_path in self.parts:
+            self.shared_strings = [str(s) for s in read_string_table(self.parts[shared_strings_path])]
+
+        workbook_root = ET.fromstring(self.workbook_xml)
+        self.sheets = []
+        for sheet_el in workbook_root.find(f"{{{MAIN_NS}}}sheets"):
+            rel_id = sheet_el.get(f"{{{REL_TYPE[:-1]}}}id")
+            rel_type, target = workbook_rels[rel_id]
+            self.sheets.append(_XmlSheet(sheet_el.get("name"), target, self.parts[target].decode("utf-8"), self.parts))
+        if [sheet.name for sheet in self.sheets] != compiled.sheetnames:
+            raise UnsupportedTemplateError("Sayfa listesi openpyxl ile uyuşmuyor")
+        for sheet, layout in zip(self.sheets, compiled.layouts):
+            sheet.trim(layout.used_max_row, layout.used_max_col)
+
+        self.styles_xml = self.parts[self.styles_path].decode("utf-8")
+        stylesheet = Stylesheet.from_tree(ET.fromstring(self.parts[self.styles_path]))
+        self.cell_xfs = list(stylesheet.cellXfs.xf)
+        self.borders = list(stylesheet.borders)
+        self.fonts = list(stylesheet.fonts)
+        self.dxfs = list(stylesheet.dxfs.dxf) if stylesheet.dxfs else []
+        # Türetilen stiller içerik olarak template'tekilerle aynıysa mevcut indeks kullanılır
+        self.xf_ids = _first_indexes(self.cell_xfs)
+        self.border_ids = _first_indexes(self.borders)
+        self.font_ids = _first_indexes(self.fonts)
+
+def _first_indexes(items):
+    indexes = {}
+    for i, item in enumerate(items):
+        indexes.setdefault(item, i)
+    return indexes
+
+_packages = {}
+MAX_PACKAGES = 8
+
+# Desteklenmeyen template'in hatası da saklanır; sonraki sınıflar paketi yeniden açmadan openpyxl'e döner
+def get_ooxml_package(compiled):
+    package = _packages.get(compiled.key)
+    if package is None:
+        try:
+            package = OoxmlPackage(compiled)
+        except UnsupportedTemplateError as e:
+            package = e
+        if len(_packages) >= MAX_PACKAGES:
+            _packages.pop(next(iter(_packages)))
+        _packages[compiled.key] = package
+    if isinstance(package, UnsupportedTemplateError):
+        raise package.with_traceback(None)
+    return package
+
+# --- SINIF BAŞINA STİL KAYDI: TÜRETİLEN KENARLIK/FONT/XF'LER TEMPLATE LİSTELERİNİN SONUNA EKLENİR ---
+class _StyleRegistry:
+    def __init__(self, package):
+        self.package = package
+        self.xfs = []
+        self.borders = []
+        self.fonts = []
+        self.dxfs = list(package.dxfs)
+        self.new_dxfs = []
+        self._xf_ids = {}
+        self._border_ids = {}
+        self._font_ids = {}
+        self._derived = {}
+
+    def xf(self, xf_id):
+        base = len(self.package.cell_xfs)
+        return self.package.cell_xfs[xf_id] if xf_id < base else self.xfs[xf_id - base]
+
+    def border(self, xf_id):
+        border_id = self.xf(xf_id).borderId or 0
+        base = len(self.package.borders)
+        return self.package.borders[border_id] if border_id < base else self.borders[border_id - base]
+
+    def font(self, xf_id):
+        font_id = self.xf(xf_id).fontId or 0
+        base = len(self.package.fonts)
+        return self.package.fonts[font_id] if font_id < base else self.fonts[font_id - base]
+
+    # Kenarlık, font ve xf'ler içerikle tekilleştirilir; aynı sonucu veren anahtarlar aynı xf'i paylaşır
+    def _add_xf(self, xf):
+        xf_id = self.package.xf_ids.get(xf, self._xf_ids.get(xf))
+        if xf_id is None:
+            self.xfs.append(xf)
+            xf_id = self._xf_ids[xf] = len(self.package.cell_xfs) + len(self.xfs) - 1
+        return xf_id
+
+    def _add_border(self, border):
+        border_id = self.package.border_ids.get(border, self._border_ids.get(border))
+        if border_id is None:
+            self.borders.append(border)
+            border_id = self._border_ids[border] = len(self.package.borders) + len(self.borders) - 1
+        return border_id
+
+    def _add_font(self, font):
+        font_id = self.package.font_ids.get(font, self._font_ids.get(font))
+        if font_id is None:
+            self.fonts.append(font)
+            font_id = self._font_ids[font] = len(self.package.fonts) + len(self.fonts) - 1
+        return font_id
+
+    def with_border(self, key, xf_id, make_border):
+        key = (key, xf_id)
+        if key not in self._derived:
+            border_id = self._add_border(make_border(self.border(xf_id)))
+            content_key = ("border", xf_id, border_id)
+            if content_key not in self._derived:
+                xf = copy(self.xf(xf_id))
+                xf.borderId = border_id
+                xf.applyBorder = True
+                self._derived[content_key] = self._add_xf(xf)
+            self._derived[key] = self._derived[content_key]
+        return self._derived[key]
+
+    def with_font(self, key, xf_id, make_font):
+        key = (key, xf_id)
+        if key not in self._derived:
+            font_id = self._add_font(make_font(self.font(xf_id)))
+            content_key = ("font", xf_id, font_id)
+            if content_key not in self._derived:
+                xf = copy(self.xf(xf_id))
+                xf.fontId = font_id
+                xf.applyFont = True
+                self._derived[content_key] = self._add_xf(xf)
+            self._derived[key] = self._derived[content_key]
+        return self._derived[key]
+
+    def add_dxf(self, dxf):
+        if dxf in self.dxfs:
+            return self.dxfs.index(dxf)
+        self.dxfs.append(dxf)
+        self.new_dxfs.append(dxf)
+        return len(self.dxfs) - 1
+
+    def render(self, styles_xml):
+        styles_xml = _append_to_collection(styles_xml, "fonts", [_to_xml(font) for font in self.fonts], len(self.package.fonts) + len(self.fonts))
+        styles_xml = _append_to_collection(styles_xml, "borders", [_to_xml(border) for border in self.borders], len(self.package.borders) + len(self.borders))
+        styles_xml = _append_to_collection(styles_xml, "cellXfs", [_to_xml(xf) for xf in self.xfs], len(self.package.cell_xfs) + len(self.xfs))
+        styles_xml = _append_to_collection(styles_xml, "dxfs", [_to_xml(dxf) for dxf in self.new_dxfs], len(self.dxfs), _AFTER_DXFS)
+        return styles_xml
+
+def _append_to_collection(xml_text, tag, items, count, insert_before=None):
+    if not items:
+        return xml_text
+    items_xml = "".join(items)
+    match = re.search(rf"<{tag}\b[^>]*?(/?)>", xml_text)
+    if match is None:
+        if insert_before is None:
+            raise UnsupportedTemplateError(f"styles.xml içinde {tag} bulunamadı")
+        return _insert_before(xml_text, f'<{tag} count="{count}">{items_xml}</{tag}>', insert_before, "</styleSheet>")
+    start_tag = re.sub(r'\s+count="\d*"', "", match.group(0)[:-2] if match.group(1) else match.group(0)[:-1])
+    start_tag = f'{start_tag} count="{count}">'
+    if match.group(1):
+        return xml_text[:match.start()] + start_tag + items_xml + f"</{tag}>" + xml_text[match.end():]
+    end = xml_text.index(f"</{tag}>", match.end())
+    return xml_text[:match.start()] + start_tag + xml_text[match.end():end] + items_xml + xml_text[end:]
+
+def _insert_before(xml_text, fragment, tags, closing_tag):
+    positions = [m.start() for tag in tags for m in [re.search(rf"<{tag}\b", xml_text)] if m]
+    position = min(positions) if positions else xml_text.rindex(closing_tag)
+    return xml_text[:position] + fragment + xml_text[position:]
+
+def _sheet_name_ref(sheet_name):
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+# --- SATIR BLOĞU: adjust_template_rows_and_tables İLE AYNI KURALLAR, XML SATIRLARI ÜZERİNDE ---
+def _rebuild_rows(sheet, layout, num_students, sheet_shifts, styles, thick_cols):
+    start_row = layout.start_row
+    actual_max_col = layout.actual_max_col
+    action_row_idx, offset = get_row_shift(num_students, layout.current_rows, start_row)
+    if offset != 0 and sheet.anchored_max_row >= action_row_idx:
+        raise UnsupportedTemplateError(f"{sheet.name}: kaydırılan satırlarda yorum, köprü veya veri doğrulaması var")
+    last_student_row = start_row + num_students - 1
+    formulas_shift = any(shift_offset != 0 for _, (_, shift_offset) in sheet_shifts)
+
+    master_formulas = layout.master_formulas
+    if formulas_shift:
+        master_formulas = {col: shift_formula_rows(formula, action_row_idx, offset, sheet_shifts) for col, formula in master_formulas.items()}
+
+    master_attrs, master_cells = sheet.rows.get(start_row, ("", {}))
+    rows = {}
+    block_cells = {}
+
+    for row_idx, (row_attrs, cells) in sheet.rows.items():
+        if offset < 0 and action_row_idx <= row_idx < action_row_idx - offset:
+            continue
+        new_row = row_idx + offset if row_idx >= action_row_idx else row_idx
+        new_cells = {}
+        for col, cell in cells.items():
+            in_block = start_row <= new_row <= last_student_row and col <= actual_max_col
+            rewritten = in_block and (col in master_formulas or col >= 5)
+            if formulas_shift and not rewritten and cell.formula:
+                cell = cell.copy()
+                cell.formula = shift_formula_rows(cell.formula, action_row_idx, offset, sheet_shifts)
+            if in_block:
+                block_cells[(new_row, col)] = cell
+            else:
+                new_cells[col] = cell
+        rows[new_row] = (row_attrs, new_cells)
+
+    for r in range(start_row, last_student_row + 1):
+        inserted = offset > 0 and action_row_idx <= r < action_row_idx + offset
+        if inserted:
+            row_attrs = master_attrs if ' ht="' in master_attrs else ""
+            cells = {}
+            rows[r] = (row_attrs, cells)
+        else:
+            row_attrs, cells = rows.setdefault(r, ("", {}))
+
+        for c in range(1, actual_max_col + 1):
+            source = None if inserted else block_cells.get((r, c))
+            if source is not None:
+                target = source.copy()
+            else:
+                master = master_cells.get(c)
+                target = _XmlCell(style=master.style if inserted and master is not None else 0)
+
+            position = get_row_position(r, start_row, last_student_row)
+            target.style = styles.with_border(("block", sheet.path, c, position), target.style,
+                                              lambda border: get_block_border(border, r, c, start_row, last_student_row, layout))
+            if thick_cols and c >= 5:
+                thick_key = ("thick", c in thick_cols, position)
+                target.style = styles.with_border(thick_key, target.style,
+                                                  lambda border: get_thick_border(border, r, c, start_row, last_student_row, thick_cols))
+
+            formula = master_formulas.get(c)
+            if formula and r == start_row:
+                target.set_value(formula)
+            elif formula:
+                try:
+                    target.set_value(translate_formula_rows(formula, start_row, r))
+                except:
+                    target.set_value(formula)
+            elif c >= 5:
+                target.set_value(None)
+            cells[c] = target
+
+    table_refs = {}
+    for table_name, ref in layout.table_refs.items():
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        table_offset = max(max_row - (start_row + layout.current_rows - 1), 0)
+        table_refs[table_name] = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{last_student_row + table_offset}"
+
+    merged_ranges = []
+    first_moved_row = action_row_idx - offset if offset < 0 else action_row_idx
+    for ref in sheet.merged_ranges:
+        merged_range = CellRange(ref)
+        if offset != 0 and merged_range.min_row >= first_moved_row:
+            merged_range.shift(row_shift=offset)
+        merged_ranges.append(merged_range.coord)
+
+    return rows, last_student_row, table_refs, merged_ranges
+
+def _writable_cell(rows, row_idx, col):
+    # Template paketindeki hücreler sınıflar arasında paylaşılır; değiştirilmeden önce kopyalanır
+    row_attrs, cells = rows.setdefault(row_idx, ("", {}))
+    cell = cells.get(col)
+    cells[col] = cell.copy() if cell is not None else _XmlCell()
+    return cells[col]
+
+def _find_advisor_cell(rows, shared_strings):
+    for row_idx in sorted(rows):
+        cells = rows[row_idx][1]
+        for col in sorted(cells):
+            text = cells[col].text(shared_strings)
+            if text and "Advisor" in text:
+                return row_idx, col
+    return None
+
+def _render_sheet_data(rows):
+    parts = ["<sheetData>"]
+    max_row, max_col = 1, 1
+    for row_idx in sorted(rows):
+        row_attrs, cells = rows[row_idx]
+        if not cells and not row_attrs:
+            continue
+        max_row = max(max_row, row_idx)
+        if cells:
+            max_col = max(max_col, max(cells))
+            parts.append(f'<row r="{row_idx}"{row_attrs}>')
+            for col in sorted(cells):
+                parts.append(cells[col].render(f"{get_column_letter(col)}{row_idx}"))
+            parts.append("</row>")
+        else:
+            parts.append(f'<row r="{row_idx}"{row_attrs}/>')
+    parts.append("</sheetData>")
+    return "".join(parts), f"A1:{get_column_letter(max_col)}{max_row}"
+
+def _render_sheet(sheet, rows, conditional_formatting, styles, password_hash, merged_ranges):
+    sheet_data, dimension = _render_sheet_data(rows)
+    head = re.sub(r'<dimension\s+ref="[^"]*"\s*/>', f'<dimension ref="{dimension}"/>', sheet.head, count=1)
+
+    tail = sheet.tail
+    if merged_ranges:
+        merge_xml = f'<mergeCells count="{len(merged_ranges)}">' + "".join(f'<mergeCell ref="{ref}"/>' for ref in merged_ranges) + "</mergeCells>"
+        tail = re.sub(r"<mergeCells\b.*?</mergeCells>", lambda m: merge_xml, tail, flags=re.S)
+
+    default_dxf = DifferentialStyle()
+    cf_parts = []
+    for cf in conditional_formatting:
+        for rule in cf.rules:
+            if rule.dxf and rule.dxf != default_dxf:
+                rule.dxfId = styles.add_dxf(rule.dxf)
+        cf_parts.append(_to_xml(cf))
+    tail = _insert_before(tail, "".join(cf_parts), _AFTER_CONDITIONAL_FORMATTING, "</worksheet>")
+
+    calc_pr = re.match(r"\s*<sheetCalcPr\b[^>]*/>", tail)
+    split = calc_pr.end() if calc_pr else 0
+    tail = tail[:split] + sheet.protection_xml_for(password_hash) + tail[split:]
+
+    return (head + sheet_data + tail).encode("utf-8")
+
+def _render_table(xml_text, table_refs):
+    match = re.search(r'<table\b[^>]*\bdisplayName="([^"]+)"', xml_text)
+    name_match = re.search(r'<table\b[^>]*\bname="([^"]+)"', xml_text)
+    new_ref = None
+    for name in [m.group(1) for m in (match, name_match) if m]:
+        if name in table_refs:
+            new_ref = table_refs[name]
+            break
+    if new_ref is None:
+        return None
+    totals = re.search(r'<table\b[^>]*\btotalsRowCount="(\d+)"', xml_text)
+    min_col, min_row, max_col, max_row = range_boundaries(new_ref)
+    filter_ref = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row - (int(totals.group(1)) if totals else 0)}"
+    xml_text = re.sub(r'(<table\b[^>]*?\bref=")[^"]*(")', lambda m: m.group(1) + new_ref + m.group(2), xml_text, count=1)
+    xml_text = re.sub(r'(<autoFilter\b[^>]*?\bref=")[^"]*(")', lambda m: m.group(1) + filter_ref + m.group(2), xml_text, count=1)
+    return xml_text.encode("utf-8")
+
+def _render_workbook(package, first_sheet_name):
+    xml_text = package.workbook_xml
+    old_name = package.sheets[0].name
+    name_attr = escape(first_sheet_name, {'"': "&quot;"})
+    xml_text = re.sub(r'(<sheet\b[^>]*?\bname=")[^"]*(")', lambda m: m.group(1) + name_attr + m.group(2), xml_text, count=1)
+
+    def rename_refs(match):
+        text = match.group(0)
+        new_ref = escape(_sheet_name_ref(first_sheet_name)) + "!"
+        text = text.replace(escape(_sheet_name_ref(old_name)) + "!", new_ref)
+        return re.sub(rf"(?<![\w'.]){re.escape(escape(old_name))}!", lambda m: new_ref, text)
+    xml_text = re.sub(r"<definedNames>.*?</definedNames>", rename_refs, xml_text, flags=re.S)
+
+    xml_text = re.sub(r"<workbookProtection\b[^>]*/>", "", xml_text)
+    xml_text = _insert_before(xml_text, _to_xml(WorkbookProtection(lockStructure=True), "workbookProtection"), ["bookViews", "sheets"], "</workbook>")
+
+    xml_text = re.sub(r"<fileSharing\b[^>]*/>", "", xml_text)
+    file_sharing = _to_xml(FileSharing(readOnlyRecommended=False))
+    file_version = re.search(r"<fileVersion\b[^>]*/>", xml_text)
+    position = file_version.end() if file_version else re.search(r"<workbook\b[^>]*>", xml_text).end()
+    xml_text = xml_text[:position] + file_sharing + xml_text[position:]
+
+    # Hücre önbellek değerleri yazılmadığı için Excel açılışta yeniden hesaplar
+    if re.search(r"<calcPr\b", xml_text):
+        xml_text = re.sub(r"<calcPr\b([^>]*?)\s*fullCalcOnLoad=\"[^\"]*\"", r"<calcPr\1", xml_text)
+        xml_text = re.sub(r"<calcPr\b", '<calcPr fullCalcOnLoad="1"', xml_text, count=1)
+    else:
+        xml_text = _insert_before(xml_text, '<calcPr fullCalcOnLoad="1"/>', ["oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst"], "</workbook>")
+    return xml_text.encode("utf-8")
+
+def _render_content_types(xml_bytes, calc_chain_path):
+    xml_text = xml_bytes.decode("utf-8").replace(TEMPLATE_MAIN_TYPE, SHEET_MAIN_TYPE)
+    if calc_chain_path:
+        xml_text = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(calc_chain_path)}"[^>]*/>', "", xml_text)
+    return xml_text.encode("utf-8")
+
+def _render_workbook_rels(xml_bytes):
+    xml_text = xml_bytes.decode("utf-8")
+    return re.sub(rf'<Relationship\b[^>]*Type="{re.escape(REL_TYPE)}calcChain"[^>]*/>', "", xml_text).encode("utf-8")
+
+def render_class_workbook(compiled, class_name, students, module_name, advisor_name, timer=NULL_TIMER):
+    with timer.stage("load_package"):
+        package = get_ooxml_package(compiled)
+    styles = _StyleRegistry(package)
+    level_prefix = get_level_prefix(class_name)
+    sheet_shifts = get_sheet_shifts(compiled.sheetnames, compiled.layouts, len(students))
+    start_row = 3
+
+    sheet_rows = []
+    table_refs = {}
+    merged = []
+    cf_lists = []
+    first_sheet_last_row = 3
+    for i, sheet in enumerate(package.sheets):
+        layout = compiled.layouts[i]
+        thick_cols = get_thick_cols(level_prefix, sheet.name) if i > 0 else None
+        with timer.stage("rows", sheet.name, sum(len(cells) for _, cells in sheet.rows.values())):
+            rows, last_student_row, refs, merged_ranges = _rebuild_rows(sheet, layout, len(students), sheet_shifts, styles, thick_cols)
+        sheet_rows.append(rows)
+        table_refs.update(refs)
+        merged.append(merged_ranges)
+
+        conditional_formatting = ConditionalFormattingList()
+        if i == 0:
+            first_sheet_last_row = last_student_row
+        else:
+            with timer.stage("conditional_formats", sheet.name):
+                add_sheet_conditional_formats(conditional_formatting, level_prefix, sheet.name, last_student_row)
+        cf_lists.append(conditional_formatting)
+
+    first_rows = sheet_rows[0]
+    title_cell = _writable_cell(first_rows, 1, 1)
+    title_cell.set_value(f"{class_name} - {module_name}")
+    title_cell.style = styles.with_font("title", title_cell.style, get_title_font)
+
+    for rows in sheet_rows[1:]:
+        _writable_cell(rows, 1, 1).set_value(f"='{class_name}'!A1")
+
+    advisor_position = _find_advisor_cell(first_rows, package.shared_strings)
+    if advisor_position is not None:
+        _writable_cell(first_rows, *advisor_position).set_value(f"Advisor: {advisor_name}")
+
+    with timer.stage("students", class_name, len(students) * 4):
+        for i, student in enumerate(students):
+            for col, key in enumerate(["index", "number", "name", "surname"], 1):
+                _writable_cell(first_rows, start_row + i, col).set_value(student[key])
+
+    with timer.stage("conditional_formats", class_name):
+        add_first_sheet_conditional_formats(cf_lists[0], first_sheet_last_row, level_prefix)
+
+    password_hash = get_format_plan(level_prefix).password_hash
+    outputs = {}
+    for i, sheet in enumerate(package.sheets):
+        with timer.stage("render_sheet", sheet.name, sum(len(cells) for _, cells in sheet_rows[i].values())):
+            outputs[sheet.path] = _render_sheet(sheet, sheet_rows[i], cf_lists[i], styles, password_hash, merged[i])
+            for table_path in sheet.tables:
+                table_xml = _render_table(package.parts[table_path].decode("utf-8"), table_refs)
+                if table_xml is not None:
+                    outputs[table_path] = table_xml
+
+    with timer.stage("styles", cells=len(styles.xfs)):
+        outputs[package.styles_path] = styles.render(package.styles_xml).encode("utf-8")
+    outputs[package.workbook_path] = _render_workbook(package, class_name)
+    outputs["[Content_Types].xml"] = _render_content_types(package.parts["[Content_Types].xml"], package.calc_chain_path)
+    workbook_rels_path = _rels_path(package.workbook_path)
+    outputs[workbook_rels_path] = _render_workbook_rels(package.parts[workbook_rels_path])
+
+    with timer.stage("save"):
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+            for info in package.infos:
+                if info.filename == package.calc_chain_path:
+                    continue
+                data = outputs.get(info.filename, package.parts[info.filename])
+                archive.writestr(info.filename, data)
+        return output.getvalue()
+
+def process_class_template_ooxml(template_bytes, class_name, students, module_name, advisor_name, timer=NULL_TIMER):
+    with timer.stage("load_template"):
+        compiled = get_compiled_template(template_bytes)
+    try:
+        return render_class_workbook(compiled, class_name, students, module_name, advisor_name, timer)
+    except UnsupportedTemplateError:
+        # Yamalanamayan template'ler için openpyxl yolu kullanılır, çıktı aynı kalır
+        return process_class_template(template_bytes, class_name, students, module_name, advisor_name, timer)
@@ -0,0 +1,119 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from collections import OrderedDict
+
+# "timing" sadece aşama sürelerini ve hücre sayılarını ölçer; diğerleri ek olarak profil çıkarır
+INSTRUMENT_MODES = ["timing", "cprofile", "tracemalloc"]
+PROFILE_TOP = 30
+
+class _Stage:
+    __slots__ = ("timer", "record", "started", "memory_before")
+
+    def __init__(self, timer, record):
+        self.timer = timer
+        self.record = record
+
+    def __enter__(self):
+        if self.timer.mode == "tracemalloc":
+            tracemalloc.reset_peak()
+            self.memory_before = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["seconds"] = time.perf_counter() - self.started
+        if self.timer.mode == "tracemalloc":
+            self.record["peak_alloc_bytes"] = tracemalloc.get_traced_memory()[1] - self.memory_before
+        self.timer.records.append(self.record)
+        return False
+
+class _NullStage:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+# Her sınıf için bir tane oluşturulur; stage() bloklarının süresi ve hücre sayısı kaydedilir
+class StageTimer:
+    def __init__(self, mode="timing"):
+        if mode not in INSTRUMENT_MODES:
+            raise ValueError(f"Bilinmeyen ölçüm modu: {mode}")
+        self.mode = mode
+        self.records = []
+        self.profile = None
+        self.total_seconds = 0.0
+        self._profiler = None
+        self._tracing = False
+        self._started = None
+
+    def stage(self, name, sheet=None, cells=None):
+        return _Stage(self, {"stage": name, "sheet": sheet, "cells": cells})
+
+    def start(self):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.total_seconds = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            self.profile = stream.getvalue()
+            self._profiler = None
+        if self._tracing:
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            self.profile = "\n".join(str(stat) for stat in statistics)
+            tracemalloc.stop()
+            self._tracing = False
+
+    def report(self):
+        return {"total_seconds": self.total_seconds, "stages": self.records, "profile": self.profile}
+
+class _NullTimer:
+    _stage = _NullStage()
+
+    def stage(self, name, sheet=None, cells=None):
+        return self._stage
+
+NULL_TIMER = _NullTimer()
+
+# --- RAPORLAR: SINIF BAŞINA KAYITLAR TABLO SATIRLARINA VE AŞAMA ÖZETİNE ÇEVRİLİR ---
+def timing_rows(reports):
+    rows = []
+    for report in reports:
+        for record in report["stages"]:
+            rows.append({
+                "class": report["class"],
+                "level": report["level"],
+                "stage": record["stage"],
+                "sheet": record.get("sheet"),
+                "seconds": round(record["seconds"], 6),
+                "cells": record.get("cells"),
+                "peak_alloc_bytes": record.get("peak_alloc_bytes")
+            })
+    return rows
+
+def summarize_stages(reports):
+    summary = OrderedDict()
+    for row in timing_rows(reports):
+        stage = summary.setdefault(row["stage"], {"stage": row["stage"], "count": 0, "seconds": 0.0, "cells": 0, "max_seconds": 0.0})
+        stage["count"] += 1
+        stage["seconds"] += row["seconds"]
+        stage["cells"] += row["cells"] or 0
+        stage["max_seconds"] = max(stage["max_seconds"], row["seconds"])
+    total = sum(stage["seconds"] for stage in summary.values()) or 1.0
+    for stage in summary.values():
+        stage["seconds"] = round(stage["seconds"], 4)
+        stage["max_seconds"] = round(stage["max_seconds"], 4)
+        stage["share"] = round(stage["seconds"] / total, 4)
+    return sorted(summary.values(), key=lambda stage: stage["seconds"], reverse=True)
@@ -0,0 +1,135 @@
+import io
+import os
+import posixpath
+import zipfile
+
+import openpyxl
+
+from .core import (
+    SheetLayout, StyleInterner, get_used_range, get_template_student_rows, get_sheet_shifts, get_level_prefix, find_advisor_cell, trim_to_used_range,
+    adjust_template_rows_and_tables, finish_class_sheet, fill_first_sheet, protect_and_save,
+)
+from .timing import NULL_TIMER
+
+ROSTER_KEYS = ["index", "number", "name", "surname"]
+
+def _student_key(number):
+    return str(number).strip() if number is not None else ""
+
+def read_gradebook_roster(first_sheet, num_rows, start_row=3):
+    students = []
+    for row in first_sheet.iter_rows(min_row=start_row, max_row=start_row + num_rows - 1, max_col=4, values_only=True):
+        students.append(dict(zip(ROSTER_KEYS, row)))
+    return students
+
+def find_advisor_name(first_sheet):
+    advisor_cell = find_advisor_cell(first_sheet)
+    return advisor_cell.value.split(":")[-1].strip() if advisor_cell is not None else ""
+
+def roster_unchanged(old_students, new_students):
+    return [[student[key] for key in ROSTER_KEYS] for student in old_students] == [[student[key] for key in ROSTER_KEYS] for student in new_students]
+
+# Öğrenci bloğundaki elle girilmiş notlar (formül olmayan, 5. sütundan itibaren) eski satır numarasıyla saklanır
+def save_student_inputs(ws, layout, start_row=3):
+    inputs = {}
+    for r in range(start_row, start_row + layout.current_rows):
+        row_inputs = {}
+        for c in range(5, layout.actual_max_col + 1):
+            cell = ws._cells.get((r, c))
+            if cell is not None and cell.value is not None and cell.data_type != 'f':
+                row_inputs[c] = cell.value
+        inputs[r] = row_inputs
+    return inputs
+
+def restore_student_inputs(ws, inputs, row_map, start_row=3):
+    for i, old_row in enumerate(row_map):
+        if old_row is None:
+            continue
+        for c, value in inputs.get(old_row, {}).items():
+            ws.cell(row=start_row + i, column=c).value = value
+
+# Daha önce dağıtılmış bir gradebook'u yeni sınıf listesine göre günceller; girilen notlar öğrenci numarasıyla taşınır.
+# Liste ve advisor değişmediyse None döner
+def update_class_gradebook(gradebook_bytes, class_name, students, advisor_name, timer=NULL_TIMER):
+    start_row = 3
+    with timer.stage("load_gradebook"):
+        wb = openpyxl.load_workbook(io.BytesIO(gradebook_bytes))
+    first_sheet = wb.worksheets[0]
+    current_rows = get_template_student_rows(wb, 0, start_row)
+    old_students = read_gradebook_roster(first_sheet, current_rows, start_row)
+
+    if roster_unchanged(old_students, students) and find_advisor_name(first_sheet) == (advisor_name or ""):
+        return None
+
+    old_rows = {}
+    for i, student in enumerate(old_students):
+        old_rows.setdefault(_student_key(student["number"]), start_row + i)
+    row_map = [old_rows.get(_student_key(student["number"])) for student in students]
+
+    layouts = []
+    for i, ws in enumerate(wb.worksheets):
+        used_range = get_used_range(ws)
+        layout = SheetLayout(ws, get_template_student_rows(wb, i, start_row, used_range), start_row, used_range)
+        trim_to_used_range(ws, layout)
+        layouts.append(layout)
+    sheet_shifts = get_sheet_shifts(wb.sheetnames, layouts, len(students))
+    styles = StyleInterner(wb)
+    level_prefix = get_level_prefix(class_name)
+    first_sheet_last_row = start_row
+
+    for i, ws in enumerate(wb.worksheets):
+        layout = layouts[i]
+        with timer.stage("save_inputs", ws.title, layout.current_rows * layout.actual_max_col):
+            inputs = save_student_inputs(ws, layout, start_row)
+        last_student_row, actual_max_col = adjust_template_rows_and_tables(ws, len(students), layout.current_rows, layout, sheet_shifts, styles, timer)
+        with timer.stage("restore_inputs", ws.title, sum(len(row_inputs) for row_inputs in inputs.values())):
+            restore_student_inputs(ws, inputs, row_map, start_row)
+
+        if i == 0:
+            first_sheet_last_row = last_student_row
+        else:
+            finish_class_sheet(ws, level_prefix, last_student_row, actual_max_col, styles, timer, start_row)
+
+    fill_first_sheet(first_sheet, students, advisor_name, first_sheet_last_row, timer, start_row, level_prefix)
+    return protect_and_save(wb, level_prefix, timer)
+
+# Önceki çıktı: oluşturulan ZIP ya da klasör. Dosyalar sınıf adıyla (dosya adından) eşlenir;
+# aynı sınıfın birden fazla kopyası (ör. çok modüllü çıktı) varsa hangisinin güncelleneceği belli olmadığı için reddedilir
+class ExistingGradebooks:
+    def __init__(self, source):
+        self._zip = None
+        self._paths = {}
+        if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+            for dirpath, _, filenames in os.walk(source):
+                for filename in filenames:
+                    if filename.endswith(".xlsx"):
+                        self._add(filename, os.path.join(dirpath, filename))
+        else:
+            self._zip = zipfile.ZipFile(source)
+            for name in self._zip.namelist():
+                if name.endswith(".xlsx"):
+                    self._add(posixpath.basename(name), name)
+
+        self.levels = {filename.split(".")[0] for filename in self._paths}
+
+    def _add(self, filename, path):
+        if filename in self._paths:
+            self.close()
+            raise ValueError(f"Mevcut gradebook'lar arasında aynı adlı birden fazla dosya var ({filename}); çok modüllü çıktıda güncellenecek modülün dosyaları ayrı bir ZIP/klasör olarak verilmeli.")
+        self._paths[filename] = path
+
+    def get(self, arcname):
+        path = self._paths.get(posixpath.basename(arcname))
+        if path is None:
+            return None
+        if self._zip is not None:
+            return self._zip.read(path)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()